@@ -7,57 +7,358 @@ This module will provide tools for executing code in various languages, includin
 - Shell commands
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 import asyncio
+import codecs
 import json
 import logging
 import os
-import tempfile
+import re
 from pathlib import Path
 import subprocess
 import shlex
-import time
 import signal
+import sys
+import time
 import functools
 
+from app.json_utils import dumps
+
+if sys.platform == "linux":
+    import fcntl
+
 # Configure logger
 logger = logging.getLogger("manus-mcp")
 
 # Sandbox configuration
 SANDBOX_DIR = os.path.expanduser(os.getenv("SANDBOX_DIR", "~/manus-sandbox"))
-os.makedirs(SANDBOX_DIR, exist_ok=True)
+if not os.path.isdir(SANDBOX_DIR):
+    os.makedirs(SANDBOX_DIR, exist_ok=True)
 logger.info(f"Using sandbox directory: {SANDBOX_DIR}")
 
+# Resolved once; SANDBOX_DIR is fixed for the lifetime of the process
+_SANDBOX_ROOT = Path(SANDBOX_DIR).resolve()
+
 # Global timeout for all operations (in seconds)
 GLOBAL_TIMEOUT = int(os.getenv("GLOBAL_TIMEOUT", "60"))
 
-def timeout_handler(signum, frame):
-    """Handler for timeout signal"""
-    raise TimeoutError("Operation timed out")
+# Operations bash_command refuses to run: privilege escalation, wiping the
+# root filesystem and redirections to or from device/kernel pseudo-files
+_UNSAFE_COMMAND = re.compile(
+    r"\b(sudo|su\s|rm\s+-rf\s+/)|[<>]\s*/(dev|proc|sys)\b",
+    re.IGNORECASE
+)
+
+# Maximum number of bytes kept from each of stdout/stderr (the rest is discarded)
+MAX_OUTPUT_BYTES = int(os.getenv("MAX_OUTPUT_BYTES", str(10 << 20)))
+
+# Maximum number of bytes returned by the interpreter's read action
+MAX_READ_BYTES = int(os.getenv("MAX_READ_BYTES", str(8 << 20)))
+
+# Leading bytes inspected for NUL bytes to detect binary files
+BINARY_SNIFF_BYTES = 8192
+
+# Read size used when draining subprocess pipes (the default Linux pipe capacity)
+READ_CHUNK_SIZE = 64 * 1024
+
+# Reusable output buffers: initial size and how many are kept on the free list
+OUTPUT_BUFFER_SIZE = 1 << 20
+OUTPUT_BUFFER_POOL_SIZE = 16
+_BUF_POOL: List[bytearray] = []
+
+# Capacity requested for subprocess stdout/stderr pipes (Linux only)
+PIPE_SIZE = int(os.getenv("PIPE_SIZE", str(1 << 20)))
+F_SETPIPE_SZ = 1031
+
+# Seconds a timed-out process group gets to exit after SIGTERM before SIGKILL
+TERMINATE_GRACE_PERIOD = 2.0
+
+# Limits and pool size for execute_python()
+EXECUTE_PYTHON_WORKERS = int(os.getenv("EXECUTE_PYTHON_WORKERS", "4"))
+EXECUTE_PYTHON_TIMEOUT = float(os.getenv("EXECUTE_PYTHON_TIMEOUT", "30"))
+EXECUTE_PYTHON_CPU_SECONDS = int(os.getenv("EXECUTE_PYTHON_CPU_SECONDS", "10"))
+EXECUTE_PYTHON_MEMORY_BYTES = int(os.getenv("EXECUTE_PYTHON_MEMORY_BYTES", str(512 << 20)))
+
+# Number of persistent interpreter workers kept per pooled language
+WORKER_POOL_SIZE = int(os.getenv("WORKER_POOL_SIZE", "2"))
+
+# Interpreter for each supported language, with the argument that makes it
+# read the program from stdin
+_LANG_CMD = {
+    "python": ("python", "-"),
+    "py": ("python", "-"),
+    "javascript": ("node", "-"),
+    "js": ("node", "-"),
+    "node": ("node", "-"),
+    "bash": ("bash", "-s"),
+    "sh": ("bash", "-s"),
+    "ruby": ("ruby", "-"),
+    "perl": ("perl", "-"),
+    "r": ("Rscript", "-"),
+}
+
+# Languages whose snippets run in a persistent worker instead of a fresh process
+_POOLED_LANGUAGES = {"python", "py"}
+_WORKER_SCRIPT = Path(__file__).with_name("interpreter_worker.py")
+
+# Persistent Python worker pools by name: the number of workers, and the CPU
+# seconds and address space bytes each run may use (0 for no limit)
+_PYTHON_WORKER_POOLS = {
+    "python": (WORKER_POOL_SIZE, 0, 0),
+    "execute_python": (EXECUTE_PYTHON_WORKERS, EXECUTE_PYTHON_CPU_SECONDS, EXECUTE_PYTHON_MEMORY_BYTES),
+}
+
+# Idle workers by pool; a None slot means the worker still has to be (re)spawned
+_WORKER_POOL: Dict[str, asyncio.Queue] = {}
+
+def _enlarge_pipe_buffers(process: asyncio.subprocess.Process) -> None:
+    """Grow the stdout/stderr pipes of a process so bursty output doesn't stall the child"""
+    if sys.platform != "linux":
+        return
+    
+    for stream in (process.stdout, process.stderr):
+        if stream is None:
+            continue
+        try:
+            pipe = stream._transport.get_extra_info('pipe')
+            fcntl.fcntl(pipe.fileno(), F_SETPIPE_SZ, PIPE_SIZE)
+        except (AttributeError, ValueError, OSError) as e:
+            # Not fatal: the pipe may already be closed or the size may
+            # exceed /proc/sys/fs/pipe-max-size
+            logger.debug(f"Could not resize subprocess pipe: {e}")
 
 def with_timeout(func):
     """Decorator to add a global timeout to any function"""
     @functools.wraps(func)
     async def wrapper(*args, **kwargs):
-        # Set a global timeout using signal
-        signal.signal(signal.SIGALRM, timeout_handler)
-        signal.alarm(GLOBAL_TIMEOUT)
-        
         try:
-            # Run the function with its own timeout
-            return await func(*args, **kwargs)
+            # Cancel the call cooperatively through the event loop once the
+            # global deadline passes; unlike SIGALRM this is per-call and
+            # works off the main thread
+            async with asyncio.timeout(GLOBAL_TIMEOUT):
+                return await func(*args, **kwargs)
         except TimeoutError:
             logger.error(f"Global timeout ({GLOBAL_TIMEOUT}s) reached in {func.__name__}")
             return json.dumps({
                 "status": "error",
                 "message": f"Operation timed out after {GLOBAL_TIMEOUT} seconds (global timeout)"
             })
-        finally:
-            # Cancel the alarm
-            signal.alarm(0)
     
     return wrapper
 
+def _acquire_buffer() -> bytearray:
+    """Take an output buffer from the free list, or allocate a new one"""
+    return _BUF_POOL.pop() if _BUF_POOL else bytearray(OUTPUT_BUFFER_SIZE)
+
+def _release_buffer(buf: bytearray) -> None:
+    """Return an output buffer to the free list, keeping its allocation"""
+    if len(_BUF_POOL) < OUTPUT_BUFFER_POOL_SIZE:
+        # Shrink buffers that grew for unusually large output
+        del buf[OUTPUT_BUFFER_SIZE:]
+        _BUF_POOL.append(buf)
+
+async def _drain(stream: asyncio.StreamReader, buf: bytearray, limit: int) -> Tuple[int, bool]:
+    """
+    Read a subprocess stream until EOF into a buffer.
+    
+    The buffer is overwritten from the start and grown as needed; bytes past
+    the returned length are stale and must be ignored.
+    
+    Args:
+        stream: The stream to read from.
+        buf: The buffer receiving the data.
+        limit: Maximum number of bytes to keep in the buffer.
+        
+    Returns:
+        The number of bytes stored and whether output beyond the limit was
+        discarded.
+    """
+    length = 0
+    truncated = False
+    while True:
+        chunk = await stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            return length, truncated
+        
+        # Keep reading past the limit so the child never blocks on a full pipe
+        room = limit - length
+        if len(chunk) > room:
+            chunk = chunk[:max(room, 0)]
+            truncated = True
+        buf[length:length + len(chunk)] = chunk
+        length += len(chunk)
+
+def _decode(buf: bytearray, length: int) -> str:
+    """Decode the first length bytes of a buffer without copying them"""
+    with memoryview(buf) as view:
+        return codecs.decode(view[:length], "utf-8", "replace")
+
+async def _feed(stream: asyncio.StreamWriter, data: bytes) -> None:
+    """Write data to a subprocess's stdin and close it"""
+    try:
+        stream.write(data)
+        await stream.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        # The process exited without reading all of its input
+        pass
+    finally:
+        stream.close()
+
+async def _communicate(process: asyncio.subprocess.Process, timeout: float,
+                       input: bytes = None,
+                       max_output_bytes: int = MAX_OUTPUT_BYTES) -> Dict[str, Any]:
+    """
+    Stream a subprocess's output until it exits.
+    
+    Args:
+        process: A process started with stdout and stderr pipes.
+        timeout: Maximum time in seconds to wait for the process.
+        input: Data to write to the process's stdin (requires a stdin pipe).
+        max_output_bytes: Maximum number of bytes kept per stream.
+        
+    Returns:
+        A dict with the exit code, decoded stdout/stderr and, if output was
+        cut off, a truncated flag.
+        
+    Raises:
+        asyncio.TimeoutError: If the process does not finish in time.
+    """
+    stdout_buf = _acquire_buffer()
+    stderr_buf = _acquire_buffer()
+    try:
+        # On timeout the task group cancels every reader before returning
+        async with asyncio.timeout(timeout), asyncio.TaskGroup() as tg:
+            stdout_task = tg.create_task(_drain(process.stdout, stdout_buf, max_output_bytes))
+            stderr_task = tg.create_task(_drain(process.stderr, stderr_buf, max_output_bytes))
+            tg.create_task(process.wait())
+            if input is not None:
+                # Feed stdin concurrently so a chatty child can't deadlock on a full pipe
+                tg.create_task(_feed(process.stdin, input))
+        
+        stdout_len, stdout_truncated = stdout_task.result()
+        stderr_len, stderr_truncated = stderr_task.result()
+        
+        result = {
+            "exit_code": process.returncode,
+            "stdout": _decode(stdout_buf, stdout_len),
+            "stderr": _decode(stderr_buf, stderr_len)
+        }
+    finally:
+        _release_buffer(stdout_buf)
+        _release_buffer(stderr_buf)
+    
+    if stdout_truncated or stderr_truncated:
+        result["truncated"] = True
+    
+    return result
+
+async def _terminate(process: asyncio.subprocess.Process) -> None:
+    """
+    Stop a process started in its own session, together with its children.
+    
+    The process group gets SIGTERM, then SIGKILL if it is still alive after
+    TERMINATE_GRACE_PERIOD seconds. The process is always reaped.
+    """
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            await asyncio.wait_for(process.wait(), TERMINATE_GRACE_PERIOD)
+            return
+        except asyncio.TimeoutError:
+            os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        # Already gone
+        pass
+    await process.wait()
+
+async def _spawn_python_worker(cpu_seconds: int, memory_bytes: int) -> asyncio.subprocess.Process:
+    """Start a persistent Python worker running app/interpreter_worker.py"""
+    logger.info("Starting persistent Python interpreter worker")
+    return await asyncio.create_subprocess_exec(
+        "python", str(_WORKER_SCRIPT), str(MAX_OUTPUT_BYTES), str(cpu_seconds), str(memory_bytes),
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+        cwd=SANDBOX_DIR,
+        start_new_session=True
+    )
+
+def _get_worker_pool(name: str) -> asyncio.Queue:
+    """Get the idle-worker queue for a pool, creating it on first use"""
+    pool = _WORKER_POOL.get(name)
+    if pool is None:
+        pool = asyncio.Queue()
+        for _ in range(_PYTHON_WORKER_POOLS[name][0]):
+            pool.put_nowait(None)
+        _WORKER_POOL[name] = pool
+    return pool
+
+async def _run_in_worker(source: str, timeout: float, pool_name: str = "python") -> Dict[str, Any]:
+    """
+    Execute Python source in a pooled worker process.
+    
+    Args:
+        source: The Python code to execute.
+        timeout: Maximum execution time in seconds.
+        pool_name: The worker pool to use, from _PYTHON_WORKER_POOLS.
+        
+    Returns:
+        A dict with the exit code and captured stdout/stderr. If the worker
+        itself dies during the run, its exit code is reported instead.
+        
+    Raises:
+        asyncio.TimeoutError: If execution does not finish in time. The worker
+            is killed and replaced on the next call.
+    """
+    pool = _get_worker_pool(pool_name)
+    worker = await pool.get()
+    try:
+        if worker is None or worker.returncode is not None:
+            _, cpu_seconds, memory_bytes = _PYTHON_WORKER_POOLS[pool_name]
+            worker = await _spawn_python_worker(cpu_seconds, memory_bytes)
+        
+        data = source.encode()
+        worker.stdin.write(b"%d\n" % len(data))
+        worker.stdin.write(data)
+        await worker.stdin.drain()
+        
+        async def read_response() -> bytes:
+            header = await worker.stdout.readline()
+            if not header:
+                return None
+            return await worker.stdout.readexactly(int(header))
+        
+        response = await asyncio.wait_for(read_response(), timeout)
+        if response is None:
+            # The executed code took the worker down with it, e.g. by
+            # killing its parent process
+            await _terminate(worker)
+            pool.put_nowait(None)
+            return {"exit_code": worker.returncode, "stdout": "", "stderr": ""}
+        result = json.loads(response)
+    except BaseException:
+        # The worker is in an unknown state (timed out, crashed or cancelled
+        # mid-request), so never hand it out again
+        pool.put_nowait(None)
+        if worker is not None:
+            await _terminate(worker)
+        raise
+    
+    pool.put_nowait(worker)
+    return result
+
+# Blocking file helpers, run via asyncio.to_thread to keep the event loop free
+
+def _read_prefix(file_path: Path, limit: int) -> Tuple[int, bytes]:
+    """Return a file's size and up to `limit` bytes from its start"""
+    with open(file_path, "rb") as f:
+        return os.fstat(f.fileno()).st_size, f.read(limit)
+
+def _write_text(file_path: Path, content: str) -> None:
+    """Write a text file, creating parent directories as needed"""
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    file_path.write_text(content)
+
 def resolve_sandbox_path(filename: str) -> Path:
     """
     Resolve a filename to a path within the sandbox directory.
@@ -71,12 +372,12 @@ def resolve_sandbox_path(filename: str) -> Path:
     Raises:
         ValueError: If the filename tries to escape the sandbox.
     """
-    # Convert to Path object and resolve to absolute path
-    sandbox_path = Path(SANDBOX_DIR).resolve()
-    file_path = (sandbox_path / filename).resolve()
+    # Resolve to an absolute path
+    file_path = (_SANDBOX_ROOT / filename).resolve()
     
-    # Check if the resolved path is within the sandbox
-    if not str(file_path).startswith(str(sandbox_path)):
+    # Check if the resolved path is within the sandbox (a plain prefix check
+    # would accept siblings such as /sandbox2 for /sandbox)
+    if not file_path.is_relative_to(_SANDBOX_ROOT):
         raise ValueError(f"File path {filename} attempts to escape the sandbox")
     
     return file_path
@@ -92,7 +393,7 @@ async def interpreter(action: str, filename: str = None, content: str = None,
     
     Args:
         action: The action to perform. Options include:
-            - 'read': Read the contents of a file
+            - 'read': Read the contents of a file (returned as JSON; large files are truncated)
             - 'write': Write content to a file
             - 'execute': Execute a file or code snippet
             - 'list': List files in the sandbox
@@ -107,9 +408,10 @@ async def interpreter(action: str, filename: str = None, content: str = None,
     try:
         if action == "list":
             logger.info("Listing files in sandbox")
-            sandbox_path = Path(SANDBOX_DIR)
-            files = [f.name for f in sandbox_path.iterdir() if f.is_file()]
-            return json.dumps({"files": files})
+            # DirEntry carries the file type from getdents, so no stat per entry
+            with os.scandir(SANDBOX_DIR) as entries:
+                files = [e.name for e in entries if e.is_file(follow_symlinks=False)]
+            return dumps({"files": files})
         
         elif action == "read":
             if not filename:
@@ -121,14 +423,22 @@ async def interpreter(action: str, filename: str = None, content: str = None,
             if not file_path.exists():
                 return f"Error: File '{filename}' does not exist"
             
-            try:
-                with open(file_path, "r") as f:
-                    content = f.read()
-                
-                return content
-            except UnicodeDecodeError:
-                # Handle binary files
+            # Only the first MAX_READ_BYTES are loaded, however large the file is
+            size, data = await asyncio.to_thread(_read_prefix, file_path, MAX_READ_BYTES)
+            
+            # Handle binary files
+            if b"\0" in data[:BINARY_SNIFF_BYTES]:
                 return f"Error: File '{filename}' appears to be a binary file and cannot be read as text"
+            
+            result = {
+                "filename": filename,
+                "size": size,
+                "content": data.decode(errors='replace')
+            }
+            if size > len(data):
+                result["truncated"] = True
+            
+            return dumps(result, pretty=True)
         
         elif action == "write":
             if not filename or content is None:
@@ -137,11 +447,7 @@ async def interpreter(action: str, filename: str = None, content: str = None,
             file_path = resolve_sandbox_path(filename)
             logger.info(f"Writing to file: {file_path}")
             
-            # Create parent directories if they don't exist
-            file_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(file_path, "w") as f:
-                f.write(content)
+            await asyncio.to_thread(_write_text, file_path, content)
             
             return f"Successfully wrote {len(content)} bytes to {filename}"
         
@@ -149,90 +455,60 @@ async def interpreter(action: str, filename: str = None, content: str = None,
             if (not filename and not content) or not language:
                 return "Error: Either filename or content, and language are required for 'execute' action"
             
-            # Determine the command to run based on the language
-            cmd = None
-            temp_file = None
+            # Snippets in pooled languages skip process startup entirely
+            if not filename and language.lower() in _POOLED_LANGUAGES:
+                logger.info(f"Executing {language} snippet in a pooled worker")
+                try:
+                    result = await _run_in_worker(content, timeout)
+                except asyncio.TimeoutError:
+                    return f"Error: Execution timed out after {timeout} seconds"
+                
+                return dumps(result, pretty=True)
+            
+            # Determine the command to run based on the language. Snippets are
+            # fed to the interpreter on stdin instead of through a temp file.
+            target = None
             
             if filename:
                 file_path = resolve_sandbox_path(filename)
                 if not file_path.exists():
                     return f"Error: File '{filename}' does not exist"
-            else:
-                # Create a temporary file with the content
-                suffix_map = {
-                    "python": ".py",
-                    "javascript": ".js",
-                    "node": ".js",
-                    "bash": ".sh",
-                    "sh": ".sh",
-                    "ruby": ".rb",
-                    "perl": ".pl",
-                    "r": ".r"
-                }
-                suffix = suffix_map.get(language.lower(), ".txt")
-                
-                temp_file = tempfile.NamedTemporaryFile(suffix=suffix, dir=SANDBOX_DIR, delete=False)
-                temp_file.write(content.encode())
-                temp_file.close()
-                file_path = Path(temp_file.name)
+                target = str(file_path)
             
             # Set up the command based on the language
-            if language.lower() in ["python", "py"]:
-                cmd = ["python", str(file_path)]
-            elif language.lower() in ["javascript", "js", "node"]:
-                cmd = ["node", str(file_path)]
-            elif language.lower() in ["bash", "sh"]:
-                cmd = ["bash", str(file_path)]
-            elif language.lower() == "ruby":
-                cmd = ["ruby", str(file_path)]
-            elif language.lower() == "perl":
-                cmd = ["perl", str(file_path)]
-            elif language.lower() == "r":
-                cmd = ["Rscript", str(file_path)]
-            else:
-                if temp_file:
-                    os.unlink(temp_file.name)
+            interpreter_cmd = _LANG_CMD.get(language.lower())
+            if interpreter_cmd is None:
                 return f"Error: Unsupported language '{language}'"
+            program, stdin_arg = interpreter_cmd
+            cmd = [program, target or stdin_arg]
             
             logger.info(f"Executing command: {' '.join(cmd)}")
             
+            # Run the command with a timeout
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=asyncio.subprocess.DEVNULL if target else asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=SANDBOX_DIR,
+                start_new_session=True
+            )
+            _enlarge_pipe_buffers(process)
+            
             try:
-                # Run the command with a timeout
-                process = await asyncio.create_subprocess_exec(
-                    *cmd,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE,
-                    cwd=SANDBOX_DIR
-                )
-                
-                try:
-                    stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
-                    stdout = stdout.decode(errors='replace')
-                    stderr = stderr.decode(errors='replace')
-                    
-                    result = {
-                        "exit_code": process.returncode,
-                        "stdout": stdout,
-                        "stderr": stderr
-                    }
-                    
-                    return json.dumps(result, indent=2)
+                result = await _communicate(process, timeout,
+                                            input=None if target else content.encode())
                 
-                except asyncio.TimeoutError:
-                    # Kill the process if it times out
-                    try:
-                        process.kill()
-                    except:
-                        pass
-                    return f"Error: Execution timed out after {timeout} seconds"
+                return dumps(result, pretty=True)
             
-            finally:
-                # Clean up temporary file if created
-                if temp_file:
-                    try:
-                        os.unlink(temp_file.name)
-                    except:
-                        pass
+            except asyncio.TimeoutError:
+                # Stop the process and anything it started if it times out
+                await _terminate(process)
+                return f"Error: Execution timed out after {timeout} seconds"
+            except BaseException:
+                # Cancelled, e.g. by the global timeout: don't leave it running
+                await _terminate(process)
+                raise
         
         else:
             return f"Error: Unknown action '{action}'"
@@ -267,10 +543,7 @@ async def bash_command(command: str, timeout: int = 30, background: bool = False
         logger.info(f"Executing bash command: {command}")
         
         # Validate the command for basic security
-        if any(unsafe_cmd in command.lower() for unsafe_cmd in [
-            "sudo", "su ", "rm -rf /", "> /dev", "< /dev", 
-            "> /proc", "< /proc", "> /sys", "< /sys"
-        ]):
+        if _UNSAFE_COMMAND.search(command):
             return "Error: Command contains potentially unsafe operations"
         
         # Generate a unique log file name for this command
@@ -278,35 +551,24 @@ async def bash_command(command: str, timeout: int = 30, background: bool = False
         log_file = os.path.join(SANDBOX_DIR, f"bg_process_{timestamp}.log")
         
         if background:
-            # For background processes, we'll use a different approach
-            # that doesn't rely on nohup which can cause issues
-            
-            # Create a shell script that will run our command
-            script_content = f"""#!/bin/bash
-cd {SANDBOX_DIR}
-{command} > {log_file} 2>&1
-"""
-            script_file = os.path.join(SANDBOX_DIR, f"run_bg_{timestamp}.sh")
-            with open(script_file, "w") as f:
-                f.write(script_content)
-            
-            os.chmod(script_file, 0o755)  # Make executable
-            
-            # Use subprocess directly for better process detachment
-            process = subprocess.Popen(
-                ["bash", script_file],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                cwd=SANDBOX_DIR,
-                start_new_session=True
-            )
+            # Run the command directly under bash -c with its output going to
+            # the log file. No wrapper script is written, and bash execs a
+            # simple command in place, so the PID is that of the workload.
+            with open(log_file, "wb") as log:
+                process = subprocess.Popen(
+                    ["bash", "-c", command],
+                    stdin=subprocess.DEVNULL,
+                    stdout=log,
+                    stderr=subprocess.STDOUT,
+                    cwd=SANDBOX_DIR,
+                    start_new_session=True
+                )
             
             # We don't wait for it to complete since it's a background process
             return json.dumps({
                 "status": "background_process_started",
                 "pid": process.pid,
                 "log_file": log_file,
-                "script_file": script_file,
                 "message": f"Process started in background with PID {process.pid}. Output is being logged to {log_file}"
             })
         else:
@@ -316,32 +578,27 @@ cd {SANDBOX_DIR}
                 'bash', '-c', command, # Execute using bash -c
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
-                cwd=SANDBOX_DIR
+                cwd=SANDBOX_DIR,
+                start_new_session=True
             )
+            _enlarge_pipe_buffers(process)
             
             try:
-                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
-                stdout = stdout.decode(errors='replace')
-                stderr = stderr.decode(errors='replace')
+                result = await _communicate(process, timeout)
                 
-                result = {
-                    "exit_code": process.returncode,
-                    "stdout": stdout,
-                    "stderr": stderr
-                }
-                
-                return json.dumps(result, indent=2)
+                return dumps(result, pretty=True)
             
             except asyncio.TimeoutError:
-                # Kill the process if it times out
-                try:
-                    process.kill()
-                except:
-                    pass
+                # Stop the process and anything it started if it times out
+                await _terminate(process)
                 return json.dumps({
                     "status": "error",
                     "message": f"Command timed out after {timeout} seconds"
                 })
+            except BaseException:
+                # Cancelled, e.g. by the global timeout: don't leave it running
+                await _terminate(process)
+                raise
     
     except Exception as e:
         logger.error(f"Bash command execution failed: {str(e)}")
@@ -355,14 +612,29 @@ async def execute_python(code: str) -> Dict[str, Any]:
     """
     Executes Python code safely in a sandbox.
     
+    The code runs in a process forked from a persistent worker, limited to
+    EXECUTE_PYTHON_CPU_SECONDS of CPU time, EXECUTE_PYTHON_MEMORY_BYTES of
+    address space and EXECUTE_PYTHON_TIMEOUT seconds of wall-clock time.
+    Compiled code is cached per worker, keyed by a digest of the source, so
+    repeated snippets are not recompiled.
+    
     Args:
         code: The Python code to execute
         
     Returns:
-        Dict with execution results, output, and errors
+        Dict with execution results, output, and errors. Code killed for
+        exceeding its CPU limit has the negated signal number as exit code
     """
-    # TODO: Implement Python code execution
-    raise NotImplementedError("Python code execution is not yet implemented.")
+    try:
+        return await _run_in_worker(code, EXECUTE_PYTHON_TIMEOUT, "execute_python")
+    except asyncio.TimeoutError:
+        # The worker and everything it started were killed; the next call
+        # spawns a replacement
+        return {
+            "exit_code": -1,
+            "stdout": "",
+            "stderr": f"Error: Execution timed out after {EXECUTE_PYTHON_TIMEOUT} seconds"
+        }
 
 
 async def execute_javascript(code: str) -> Dict[str, Any]:
@@ -0,0 +1,191 @@
+"""
+Persistent Python worker for the code interpreter.
+
+This script is started by app.code_execution and kept alive between calls so
+that the interpreter startup cost is paid once per worker instead of once per
+execution. The protocol is length-prefixed on both sides:
+
+- request:  b"<length>\\n" followed by <length> bytes of UTF-8 source code
+- response: b"<length>\\n" followed by <length> bytes of JSON with the keys
+  exit_code, stdout, stderr and, if output was cut off, truncated
+
+Each request runs in a child forked from the worker, so executed code starts
+from a clean interpreter every time: modules it imports, environment variables
+and other interpreter state it changes die with the child. The worker itself
+never runs requested code.
+
+Output of the executed code (including that of any child processes it starts)
+is captured at the file-descriptor level so it can never corrupt the protocol
+stream.
+
+Workers started with CPU and memory limits apply them to each child, which
+is how app.code_execution backs execute_python(). Compiled code is cached in
+the worker, keyed by a digest of the source, so retried snippets skip
+compilation.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import traceback
+from collections import OrderedDict
+
+# Compiled code objects by source digest, kept by the worker so that
+# retried snippets skip compilation
+_CODE_CACHE = OrderedDict()
+_CODE_CACHE_SIZE = 512
+
+
+def _read_output(f, limit: int):
+    """Read captured output back from a temporary file, honouring the size limit."""
+    f.seek(0)
+    data = f.read(limit + 1)
+    return data[:limit].decode(errors="replace"), len(data) > limit
+
+
+def _exit_code(exc: SystemExit) -> int:
+    """Translate a SystemExit into a process exit code like the interpreter does."""
+    if exc.code is None:
+        return 0
+    if isinstance(exc.code, int):
+        return exc.code
+    print(exc.code, file=sys.stderr)
+    return 1
+
+
+def _set_limit(which: int, soft: int) -> None:
+    """Lower the soft limit of a resource, staying within its hard limit."""
+    _, hard = resource.getrlimit(which)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(which, (soft, hard))
+
+
+def _compile_cached(source: str):
+    """Compile source code, reusing the code object for previously seen sources."""
+    digest = hashlib.blake2b(source.encode(), digest_size=16).digest()
+    code = _CODE_CACHE.get(digest)
+    if code is not None:
+        _CODE_CACHE.move_to_end(digest)
+        return code
+
+    code = compile(source, "<stdin>", "exec")
+    _CODE_CACHE[digest] = code
+    if len(_CODE_CACHE) > _CODE_CACHE_SIZE:
+        _CODE_CACHE.popitem(last=False)
+    return code
+
+
+def _run_child(code, workdir: str, out, err, private_fds, cpu_seconds: int, memory_bytes: int) -> None:
+    """Execute a code object (or report its compile error) in the forked child and exit."""
+    exit_code = 1
+    try:
+        for fd in private_fds:
+            os.close(fd)
+        os.chdir(workdir)
+        sys.argv = ["-"]
+        os.dup2(out.fileno(), 1)
+        os.dup2(err.fileno(), 2)
+        # A forked child starts with no CPU time used, so the limit is per run
+        if cpu_seconds:
+            _set_limit(resource.RLIMIT_CPU, cpu_seconds)
+        if memory_bytes:
+            _set_limit(resource.RLIMIT_AS, memory_bytes)
+        try:
+            if isinstance(code, BaseException):
+                raise code.with_traceback(None)
+            exec(code, {"__name__": "__main__"})
+            exit_code = 0
+        except SystemExit as e:
+            exit_code = _exit_code(e)
+        except BaseException as e:
+            # Drop this module's frame from the reported traceback
+            traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+        # Wind down like the interpreter does at exit
+        threading._shutdown()
+        atexit._run_exitfuncs()
+        sys.stdout.flush()
+        sys.stderr.flush()
+    finally:
+        os._exit(exit_code)
+
+
+def run(source: str, workdir: str, limit: int, private_fds=(),
+        cpu_seconds: int = 0, memory_bytes: int = 0) -> dict:
+    """
+    Execute source code in a forked child and capture its output.
+
+    Args:
+        source: The Python source code to execute
+        workdir: Directory to run the code in
+        limit: Maximum number of bytes kept from each of stdout/stderr
+        private_fds: File descriptors the child closes before running the code
+        cpu_seconds: CPU time the child may use before it is killed (0 for no limit)
+        memory_bytes: Address space limit for the child (0 for no limit)
+
+    Returns:
+        Dict with the exit code and captured output; a child killed by a
+        signal has the negated signal number as its exit code
+    """
+    try:
+        code = _compile_cached(source)
+    except Exception as e:
+        # Reported by the child like any other error in the code
+        code = e
+
+    with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        pid = os.fork()
+        if pid == 0:
+            _run_child(code, workdir, out, err, private_fds, cpu_seconds, memory_bytes)
+        _, status = os.waitpid(pid, 0)
+        exit_code = os.waitstatus_to_exitcode(status)
+
+        stdout, stdout_truncated = _read_output(out, limit)
+        stderr, stderr_truncated = _read_output(err, limit)
+
+    result = {"exit_code": exit_code, "stdout": stdout, "stderr": stderr}
+    if stdout_truncated or stderr_truncated:
+        result["truncated"] = True
+    return result
+
+
+def main() -> None:
+    """Serve execution requests until stdin is closed."""
+    limit = int(sys.argv[1])
+    # Optional per-run limits: CPU seconds and address space bytes
+    cpu_seconds = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    memory_bytes = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    workdir = os.getcwd()
+
+    # Keep private copies of the protocol pipes and hand the executed code
+    # /dev/null instead, so input() or stray prints can't touch the protocol
+    requests = os.fdopen(os.dup(0), "rb")
+    responses = os.fdopen(os.dup(1), "wb")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    os.close(devnull)
+
+    # Behave like `python -` for imports relative to the working directory
+    sys.path[0] = ""
+
+    while True:
+        header = requests.readline()
+        if not header:
+            break
+        source = requests.read(int(header)).decode(errors="replace")
+        result = run(source, workdir, limit, (requests.fileno(), responses.fileno()),
+                     cpu_seconds, memory_bytes)
+        payload = json.dumps(result).encode()
+        responses.write(b"%d\n" % len(payload))
+        responses.write(payload)
+        responses.flush()
+
+
+if __name__ == "__main__":
+    main()
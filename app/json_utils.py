@@ -0,0 +1,72 @@
+"""
+JSON helpers for Manus MCP.
+
+Tool results and Chrome DevTools frames can carry megabytes of program output
+or page HTML, so they are handled with orjson when it is installed
+(pip install "manus-mcp[speedups]") and with the standard library otherwise.
+"""
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj: Any, pretty: bool = False) -> str:
+    """
+    Serialize an object to a JSON string.
+    
+    Args:
+        obj: The object to serialize
+        pretty: Whether to indent the output by two spaces
+        
+    Returns:
+        The JSON document as a string
+    """
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if pretty else 0
+        try:
+            return orjson.dumps(obj, option=option).decode()
+        except TypeError:
+            # orjson refuses strings that aren't valid UTF-8, such as page
+            # text with lone surrogates; the standard library escapes them
+            return _stdlib_dumps(obj, pretty, ensure_ascii=True)
+    # Match orjson's output: non-ASCII unescaped, unless that leaves lone
+    # surrogates the caller couldn't encode as UTF-8
+    text = _stdlib_dumps(obj, pretty, ensure_ascii=False)
+    try:
+        text.encode("utf-8")
+    except UnicodeEncodeError:
+        return _stdlib_dumps(obj, pretty, ensure_ascii=True)
+    return text
+
+
+def _stdlib_dumps(obj: Any, pretty: bool, ensure_ascii: bool) -> str:
+    """Serialize an object with the json module, formatted like orjson."""
+    if pretty:
+        return json.dumps(obj, indent=2, ensure_ascii=ensure_ascii)
+    # No spaces after separators
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=ensure_ascii)
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    Deserialize a JSON document.
+    
+    Args:
+        data: The JSON document as text or UTF-8 bytes
+        
+    Returns:
+        The decoded object
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson rejects some documents the standard library accepts,
+            # such as strings with lone surrogate escapes
+            pass
+    return json.loads(data)
@@ -5,84 +5,258 @@ This module provides tools for browsing the web using Chrome DevTools Protocol.
 """
 
 import asyncio
-import json
+import io
+import logging
+import itertools
 import os
+import time
+from collections import defaultdict
+import httpx
 import websockets
-from typing import Dict, Any, Optional
-import requests
-from bs4 import BeautifulSoup
+from typing import Dict, Any, List, Optional, Set
+from lxml import etree
+
+from app.json_utils import dumps, loads
+
+
+logger = logging.getLogger("manus-mcp")
+
+# Seconds to wait for a page's load event after navigating
+PAGE_LOAD_TIMEOUT = float(os.getenv("CHROME_PAGE_LOAD_TIMEOUT", "15"))
+
+# Seconds between websocket keepalive pings; a ping that goes unanswered for
+# as long drops the connection so the next command reconnects
+HEARTBEAT_INTERVAL = float(os.getenv("CHROME_HEARTBEAT_INTERVAL", "30"))
+
+# Seconds a fetch result is reused while the tab still shows the fetched page
+PAGE_CACHE_TTL = float(os.getenv("CHROME_PAGE_CACHE_TTL", "60"))
+
+# Seconds a page summary is reused by back-to-back get_summary calls
+SUMMARY_CACHE_TTL = 0.75
+
+# Number of dedicated tabs fetch_webpages loads pages in concurrently
+FETCH_POOL_SIZE = int(os.getenv("CHROME_FETCH_POOL_SIZE", "4"))
+
+
+# Ids of the tabs opened by new_tab browsers, which other browsers leave alone
+_owned_tabs: Set[str] = set()
+
+
+# Evaluated in the page by ChromeBrowser.get_summary; %(length)d is the text
+# length in code points. JS strings slice by UTF-16 code units, which can cut
+# an emoji in half, so at most twice as many units are split into code points
+_SUMMARY_EXPRESSION = """(() => ({
+    title: document.title,
+    description: (document.querySelector('meta[name="description" i]') || {}).content || '',
+    text: Array.from((document.body ? document.body.innerText : '').slice(0, 2 * %(length)d))
+        .slice(0, %(length)d).join(''),
+    linkCount: document.links.length,
+    imageCount: document.images.length
+}))()"""
 
 
 class ChromeBrowser:
     """Chrome browser automation using DevTools Protocol."""
     
-    def __init__(self, chrome_host: str = None, chrome_port: int = None):
+    def __init__(self, chrome_host: str = None, chrome_port: int = None, new_tab: bool = False):
         self.chrome_host = chrome_host or os.getenv("CHROME_MCP_HOST", "localhost")
         self.chrome_port = chrome_port or int(os.getenv("CHROME_MCP_PORT", "9229"))
+        # Open a tab of our own instead of driving the first existing one
+        self.new_tab = new_tab
         self.ws_url = None
         self.websocket = None
         self.tab_id = None
-        self.request_id = 0
+        # Last URL navigated to, and the fetch result extracted from it as
+        # (url, expires_at, text_limit, result)
+        self.url = None
+        self._page_cache = None
+        # Latest get_summary result as (url, expires_at, text_limit, result)
+        self._summary_cache = None
+        self._ids = itertools.count(1)
+        # Futures for in-flight commands (by id) and awaited events (by method),
+        # resolved by the reader task
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._event_waiters: Dict[str, List[asyncio.Future]] = defaultdict(list)
+        self._reader: Optional[asyncio.Task] = None
+        self._connected = False
+        self._connect_lock = asyncio.Lock()
+        # Held by callers for the duration of a sequence of page operations
+        # (e.g. navigate then read) so other users of the tab can't interleave
+        self.lock = asyncio.Lock()
     
     async def connect(self) -> bool:
         """Connect to Chrome DevTools."""
         try:
-            # Get available tabs
-            response = requests.get(f"http://{self.chrome_host}:{self.chrome_port}/json")
-            tabs = response.json()
+            # Drop what is left of a previous connection; the tab may have
+            # moved on (or be a new one) by the time we are back
+            await self.close()
+            self._forget_page()
             
-            if not tabs:
-                return False
+            # Get available tabs
+            base_url = f"http://{self.chrome_host}:{self.chrome_port}"
+            async with httpx.AsyncClient() as client:
+                response = await client.get(f"{base_url}/json")
+                tabs = [t for t in response.json() if t.get('type', 'page') == 'page']
+                
+                # Reconnect to our own tab if it is still open
+                tab = next((t for t in tabs if t['id'] == self.tab_id), None)
+                if tab is None and self.new_tab:
+                    _owned_tabs.discard(self.tab_id)
+                    response = await client.put(f"{base_url}/json/new")
+                    tab = response.json()
+                    _owned_tabs.add(tab['id'])
+                elif tab is None:
+                    # Use the first tab that no new_tab browser is driving
+                    tab = next((t for t in tabs if t['id'] not in _owned_tabs), None)
+                    if tab is None:
+                        return False
             
-            # Use first available tab or create new one
-            tab = tabs[0]
             self.tab_id = tab['id']
             self.ws_url = tab['webSocketDebuggerUrl']
             
-            # Connect via WebSocket
-            self.websocket = await websockets.connect(self.ws_url)
+            # Connect via WebSocket; a single reader task routes every incoming
+            # frame so that several commands can be in flight at once
+            self.websocket = await websockets.connect(
+                self.ws_url,
+                ping_interval=HEARTBEAT_INTERVAL,
+                ping_timeout=HEARTBEAT_INTERVAL,
+            )
+            self._reader = asyncio.create_task(self._reader_loop())
             
             # Enable necessary domains
-            await self._send_command("Runtime.enable")
-            await self._send_command("Page.enable")
+            await self._call("Runtime.enable")
+            await self._call("Page.enable")
             
+            self._connected = True
             return True
         except Exception as e:
             # Don't print to avoid MCP protocol contamination
             return False
     
+    async def _reader_loop(self) -> None:
+        """Dispatch incoming frames to command futures and event waiters."""
+        try:
+            async for raw in self.websocket:
+                try:
+                    message = loads(raw)
+                except ValueError as e:
+                    # Skip the frame rather than drop the whole connection
+                    logger.warning("Ignoring undecodable Chrome DevTools frame: %s", e)
+                    continue
+                if "id" in message:
+                    future = self._pending.pop(message["id"], None)
+                    if future is not None and not future.done():
+                        future.set_result(message)
+                elif "method" in message:
+                    for future in self._event_waiters.pop(message["method"], ()):
+                        if not future.done():
+                            future.set_result(message)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self._connected = False
+            # Nothing else will arrive; fail everyone still waiting
+            error = ConnectionError("Chrome DevTools connection closed")
+            waiting = list(self._pending.values())
+            for waiters in self._event_waiters.values():
+                waiting.extend(waiters)
+            self._pending.clear()
+            self._event_waiters.clear()
+            for future in waiting:
+                if not future.done():
+                    future.set_exception(error)
+    
+    async def _ensure_connected(self) -> bool:
+        """Connect, or reconnect after the connection dropped, if needed."""
+        if self._connected:
+            return True
+        async with self._connect_lock:
+            return self._connected or await self.connect()
+    
     async def _send_command(self, method: str, params: Optional[Dict] = None) -> Dict[str, Any]:
-        """Send command to Chrome DevTools."""
-        self.request_id += 1
+        """Send command to Chrome DevTools, reconnecting first if necessary."""
+        if not await self._ensure_connected():
+            raise ConnectionError(
+                f"Could not connect to Chrome DevTools at {self.chrome_host}:{self.chrome_port}"
+            )
+        return await self._call(method, params)
+    
+    async def _call(self, method: str, params: Optional[Dict] = None) -> Dict[str, Any]:
+        """Send command over the current connection and wait for its response."""
+        if self._reader is None or self._reader.done():
+            raise ConnectionError("Not connected to Chrome DevTools")
+        
+        request_id = next(self._ids)
         command = {
-            "id": self.request_id,
+            "id": request_id,
             "method": method,
             "params": params or {}
         }
         
-        await self.websocket.send(json.dumps(command))
-        
-        while True:
-            response = json.loads(await self.websocket.recv())
-            if response.get("id") == self.request_id:
-                return response
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            await self.websocket.send(dumps(command))
+            return await future
+        finally:
+            self._pending.pop(request_id, None)
+    
+    def _expect_event(self, method: str) -> asyncio.Future:
+        """Register interest in the next CDP event with the given method."""
+        future = asyncio.get_running_loop().create_future()
+        self._event_waiters[method].append(future)
+        return future
+    
+    async def _wait_for_event(self, method: str, waiter: asyncio.Future,
+                              timeout: float) -> Optional[Dict[str, Any]]:
+        """Wait for an event registered with _expect_event, returning None if it doesn't arrive in time."""
+        try:
+            return await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            waiters = self._event_waiters.get(method)
+            if waiters and waiter in waiters:
+                waiters.remove(waiter)
+            return None
     
     async def navigate(self, url: str) -> Dict[str, Any]:
         """Navigate to URL."""
+        self._forget_page()
         try:
-            if not self.websocket:
-                if not await self.connect():
-                    return {"success": False, "error": "Failed to connect to Chrome"}
+            if not await self._ensure_connected():
+                return {"success": False, "error": "Failed to connect to Chrome"}
             
+            # Subscribe before navigating so a fast load event can't be missed
+            loaded = self._expect_event("Page.loadEventFired")
             response = await self._send_command("Page.navigate", {"url": url})
             
-            # Wait for page load
-            await asyncio.sleep(2)
+            # Wait for page load; slow pages are used as they are after the timeout
+            if await self._wait_for_event("Page.loadEventFired", loaded, PAGE_LOAD_TIMEOUT) is None:
+                logger.warning("Page load event not received within %ss for %s", PAGE_LOAD_TIMEOUT, url)
             
+            self.url = url
             return {"success": True, "url": url}
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    def _forget_page(self) -> None:
+        """Drop what is known about the page shown in the tab, once it may have changed."""
+        self.url = None
+        self._page_cache = None
+        self._summary_cache = None
+    
+    def cached_page(self, url: str, text_limit: Optional[int]) -> Optional[Dict[str, Any]]:
+        """Return the cached fetch result for url if the tab is still showing it."""
+        if self._page_cache is None or self.url != url:
+            return None
+        cached_url, expires_at, cached_limit, result = self._page_cache
+        if cached_url != url or cached_limit != text_limit or time.monotonic() >= expires_at:
+            return None
+        return result
+    
+    def cache_page(self, url: str, text_limit: Optional[int], result: Dict[str, Any]) -> None:
+        """Remember the fetch result extracted from the page at url."""
+        self._page_cache = (url, time.monotonic() + PAGE_CACHE_TTL, text_limit, result)
+    
     async def get_content(self) -> Dict[str, Any]:
         """Get page content."""
         try:
@@ -102,113 +276,321 @@ class ChromeBrowser:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    async def get_summary(self, text_limit: int = 3000) -> Dict[str, Any]:
+        """
+        Get the page title, description, text and link/image counts.
+        
+        Everything is computed in the page, so only a small JSON object is
+        transferred instead of the full HTML.
+        
+        Args:
+            text_limit: Maximum number of characters of page text to return;
+                one more is sent so callers can tell the text was cut
+            
+        Returns:
+            Dict with title, description, text, link_count and image_count
+        """
+        if self._summary_cache is not None:
+            cached_url, expires_at, cached_limit, result = self._summary_cache
+            if cached_url == self.url and cached_limit == text_limit and time.monotonic() < expires_at:
+                return result
+        
+        try:
+            response = await self._send_command("Runtime.evaluate", {
+                "expression": _SUMMARY_EXPRESSION % {"length": text_limit + 1},
+                "returnByValue": True
+            })
+            
+            result = response.get("result", {})
+            if "exceptionDetails" in result:
+                return {"success": False, "error": result["exceptionDetails"].get("text", "Script error")}
+            if "value" not in result.get("result", {}):
+                return {"success": False, "error": "Failed to get page summary"}
+            
+            summary = result["result"]["value"]
+            result = {
+                "success": True,
+                "title": summary["title"],
+                "description": summary["description"],
+                "text": summary["text"],
+                "link_count": summary["linkCount"],
+                "image_count": summary["imageCount"]
+            }
+            self._summary_cache = (self.url, time.monotonic() + SUMMARY_CACHE_TTL, text_limit, result)
+            return result
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    async def evaluate(self, expression: str) -> Dict[str, Any]:
+        """
+        Run JavaScript in the page.
+        
+        The script may change the page or navigate away from it, so the
+        cached summary and fetch result are dropped.
+        
+        Args:
+            expression: The JavaScript expression to evaluate
+            
+        Returns:
+            The raw Runtime.evaluate response
+        """
+        self._forget_page()
+        return await self._send_command("Runtime.evaluate", {"expression": expression})
+    
     async def close(self):
         """Close WebSocket connection."""
-        if self.websocket:
-            await self.websocket.close()
+        self._connected = False
+        websocket, self.websocket = self.websocket, None
+        reader, self._reader = self._reader, None
+        if websocket:
+            await websocket.close()
+        if reader:
+            try:
+                await reader
+            except Exception as e:
+                # The connection is gone either way; don't let it block reconnecting
+                logger.warning("Chrome DevTools reader stopped with an error: %s", e)
 
 
-# Global browser instance
-_browser = None
+# Elements whose text is not part of the visible page content
+_NON_TEXT_TAGS = {"script", "style"}
 
 
-async def _get_browser() -> ChromeBrowser:
-    """Get or create browser instance."""
-    global _browser
-    if _browser is None:
-        _browser = ChromeBrowser()
-    return _browser
+# Browsers on dedicated tabs used by fetch_webpages, created on first use
+_fetch_pool: Optional[asyncio.Queue] = None
 
 
-async def fetch_webpage(url: str) -> Dict[str, Any]:
+def _extract(html: str, fields: Set[str], text_limit: Optional[int] = None) -> Dict[str, Any]:
     """
-    Fetches a webpage from the given URL using Chrome DevTools Protocol.
+    Extract the requested fields from HTML in a single streaming pass.
+    
+    Parsing stops as soon as every requested field is complete, so callers
+    that don't need links or images usually only parse a prefix of the page.
     
     Args:
-        url: The URL to fetch
+        html: The HTML content to extract from
+        fields: Names of the fields to fill in, a subset of
+            title, description, text, links and images
+        text_limit: Stop collecting page text once it is longer than this many
+            characters
         
     Returns:
-        Dict with the page content and metadata
+        Dict with the requested fields
     """
-    try:
-        browser = await _get_browser()
+    want_title = "title" in fields
+    want_description = "description" in fields
+    want_text = "text" in fields
+    want_links = "links" in fields
+    want_images = "images" in fields
+    
+    title = None
+    description = None
+    text_parts = []
+    # Length of the text collected so far, including separators
+    text_len = -1
+    text_full = not want_text
+    links = []
+    images = []
+    # <a href> elements still being parsed, with the text seen inside them
+    open_links = []
+    # Text slot (element, "text" or "tail") that is complete once the
+    # next parser event arrives
+    pending = None
+    # Title and description are settled once <head> has been parsed
+    head_done = False
+    
+    # Stream the document instead of building the whole tree: every
+    # element is cleared as soon as it has been processed. Page strings
+    # from Chrome may hold lone surrogates, which become replacement marks
+    events = etree.iterparse(
+        io.BytesIO(html.encode("utf-8", "replace")), events=("start", "end", "comment", "pi"),
+        html=True, encoding="utf-8"
+    ) if html.strip() else ()
+    for event, element in events:
+        if pending is not None and (not text_full or open_links):
+            node, slot = pending
+            chunk = node.tail if slot == "tail" else node.text
+            # Skip the contents of script and style elements
+            if chunk and (slot == "tail" or node.tag not in _NON_TEXT_TAGS):
+                chunk = chunk.strip()
+                if chunk:
+                    if not text_full:
+                        text_parts.append(chunk)
+                        text_len += len(chunk) + 1
+                        text_full = text_limit is not None and text_len > text_limit
+                    for _, link_parts in open_links:
+                        link_parts.append(chunk)
         
-        # Navigate to URL
-        nav_result = await browser.navigate(url)
-        if not nav_result["success"]:
-            return nav_result
+        if event == "start":
+            if want_links and element.tag == "a" and element.get("href") is not None:
+                open_links.append((element, []))
+            pending = (element, "text")
+            continue
         
-        # Get page content
-        content_result = await browser.get_content()
-        if not content_result["success"]:
-            return content_result
+        if event == "end":
+            tag = element.tag
+            if tag == "title":
+                if title is None:
+                    title = element.text or ""
+            elif tag == "meta":
+                # Real-world pages also spell it name="Description"
+                if (want_description and description is None
+                        and (element.get("name") or "").lower() == "description"):
+                    description = element.get("content", "")
+            elif tag == "img":
+                if want_images and element.get("src") is not None:
+                    images.append({"alt": element.get("alt", ""), "src": element.get("src")})
+            elif tag == "a":
+                if open_links and open_links[-1][0] is element:
+                    link, link_parts = open_links.pop()
+                    links.append({"text": " ".join(link_parts), "href": link.get("href")})
+            elif tag == "head":
+                head_done = True
+            
+            # The tail is kept: it is the next pending text slot
+            element.clear(keep_tail=True)
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+            
+            if (text_full and not want_links and not want_images
+                    and (head_done or ((title is not None or not want_title)
+                                       and (description is not None or not want_description)))):
+                break
         
-        # Extract metadata
-        html = content_result["html"]
-        soup = BeautifulSoup(html, 'html.parser')
+        pending = (element, "tail")
+    
+    result = {}
+    if want_title:
+        result["title"] = title
+    if want_description:
+        result["description"] = description
+    if want_text:
+        result["text"] = " ".join(text_parts)
+    if want_links:
+        result["links"] = links
+    if want_images:
+        result["images"] = images
+    return result
+
+
+def _get_fetch_pool() -> asyncio.Queue:
+    """Get or create the pool of browsers used by fetch_webpages."""
+    global _fetch_pool
+    if _fetch_pool is None:
+        _fetch_pool = asyncio.Queue()
+        for _ in range(FETCH_POOL_SIZE):
+            _fetch_pool.put_nowait(ChromeBrowser(new_tab=True))
+    return _fetch_pool
+
+
+async def _fetch_with(browser: ChromeBrowser, url: str, text_limit: Optional[int]) -> Dict[str, Any]:
+    """Load a page in the given browser and extract its metadata and text."""
+    try:
+        # Only the CDP round-trips need the tab; parsing happens after the
+        # lock is released
+        async with browser.lock:
+            # Fetching the page the tab was just fetched at needs no reload
+            cached = browser.cached_page(url, text_limit)
+            if cached is not None:
+                return cached
+            
+            # Navigate to URL
+            nav_result = await browser.navigate(url)
+            if not nav_result["success"]:
+                return nav_result
+            
+            # Get page content
+            content_result = await browser.get_content()
+            if not content_result["success"]:
+                return content_result
         
-        title = soup.title.string if soup.title else "No title"
-        meta_description = ""
-        if soup.find("meta", {"name": "description"}):
-            meta_description = soup.find("meta", {"name": "description"}).get("content", "")
+        html = content_result["html"]
+        extracted = _extract(html, {"title", "description", "text"}, text_limit)
         
-        return {
+        result = {
             "success": True,
             "url": url,
-            "title": title,
-            "description": meta_description,
-            "html": html,
-            "text": soup.get_text(strip=True, separator=' ')
+            "title": extracted["title"] if extracted["title"] is not None else "No title",
+            "description": extracted["description"] or "",
+            "text": extracted["text"],
+            "html": html
         }
+        browser.cache_page(url, text_limit, result)
+        return result
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
-async def extract_content(html: str) -> Dict[str, Any]:
+async def fetch_webpage(url: str, text_limit: Optional[int] = None,
+                        browser: Optional[ChromeBrowser] = None) -> Dict[str, Any]:
+    """
+    Fetches a webpage from the given URL using Chrome DevTools Protocol.
+    
+    Args:
+        url: The URL to fetch
+        text_limit: Stop collecting page text once it is longer than this many
+            characters
+        browser: Browser to load the page in; a temporary connection to the
+            first tab is used if not given
+        
+    Returns:
+        Dict with the page title, description, text and raw HTML
+    """
+    if browser is not None:
+        return await _fetch_with(browser, url, text_limit)
+    
+    browser = ChromeBrowser()
+    try:
+        return await _fetch_with(browser, url, text_limit)
+    finally:
+        await browser.close()
+
+
+async def fetch_webpages(urls: List[str], text_limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Fetches several webpages concurrently, each in a tab of its own.
+    
+    Args:
+        urls: The URLs to fetch
+        text_limit: Stop collecting page text once it is longer than this many
+            characters
+        
+    Returns:
+        List with a fetch_webpage result for each URL, in the same order
+    """
+    pool = _get_fetch_pool()
+    
+    async def fetch_one(url: str) -> Dict[str, Any]:
+        browser = await pool.get()
+        try:
+            return await _fetch_with(browser, url, text_limit)
+        finally:
+            pool.put_nowait(browser)
+    
+    return await asyncio.gather(*(fetch_one(url) for url in urls))
+
+
+async def extract_content(html: str, text_limit: Optional[int] = None) -> Dict[str, Any]:
     """
     Extracts relevant content from HTML.
     
     Args:
         html: The HTML content to extract from
+        text_limit: Stop collecting page text once it is longer than this many
+            characters; links and images are still collected in full
         
     Returns:
         Dict with extracted content
     """
     try:
-        soup = BeautifulSoup(html, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.decompose()
-        
-        # Extract text
-        text = soup.get_text(strip=True, separator=' ')
-        
-        # Extract links
-        links = []
-        for link in soup.find_all('a', href=True):
-            links.append({
-                "text": link.get_text(strip=True),
-                "href": link['href']
-            })
-        
-        # Extract images
-        images = []
-        for img in soup.find_all('img', src=True):
-            images.append({
-                "alt": img.get('alt', ''),
-                "src": img['src']
-            })
-        
-        # Extract title
-        title = soup.title.string if soup.title else ""
+        extracted = _extract(html, {"title", "text", "links", "images"}, text_limit)
         
         return {
             "success": True,
-            "title": title,
-            "text": text,
-            "links": links,
-            "images": images
+            "title": extracted["title"] or "",
+            "text": extracted["text"],
+            "links": extracted["links"],
+            "images": extracted["images"]
         }
     except Exception as e:
-        return {"success": False, "error": str(e)} 
\ No newline at end of file
+        return {"success": False, "error": str(e)}
@@ -1,9 +1,15 @@
 from typing import Any, Dict, List, Optional
 import asyncio
+import atexit
 import logging
+import logging.config
 import os
-import json
 import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 
 # Disable browser-use telemetry before importing
 os.environ['BROWSER_USE_TELEMETRY'] = 'false'
@@ -13,22 +19,42 @@ log_dir = os.path.expanduser("~/manus-mcp-logs")
 os.makedirs(log_dir, exist_ok=True)
 log_file = os.path.join(log_dir, "manus-mcp.log")
 
-# Remove all existing handlers to prevent any output to stdout/stderr
-for handler in logging.root.handlers[:]:
-    logging.root.removeHandler(handler)
-
-# Configure logging with only file handler
-logging.basicConfig(
-    level=getattr(logging, os.getenv("LOG_LEVEL", "INFO")),
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[logging.FileHandler(log_file, mode="a")],
-    force=True
-)
-
-# Redirect stderr to log file to prevent contamination of stdio
-# but preserve original stderr for MCP if needed
+# Configure logging once: the root logger gets the only output, a rotating
+# file handler (replacing any existing handlers, so nothing reaches
+# stdout/stderr), and library loggers propagate to it
+logging.config.dictConfig({
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "default": {"format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s"},
+    },
+    "handlers": {
+        "file": {
+            "class": "logging.handlers.RotatingFileHandler",
+            "filename": log_file,
+            "maxBytes": 10_000_000,
+            "backupCount": 3,
+            "formatter": "default",
+        },
+        "null": {"class": "logging.NullHandler"},
+    },
+    "root": {"level": os.getenv("LOG_LEVEL", "INFO"), "handlers": ["file"]},
+    "loggers": {
+        "browser_use": {"level": "INFO", "handlers": [], "propagate": True},
+        "httpx": {"level": "WARNING", "handlers": [], "propagate": True},
+        "playwright": {"level": "WARNING", "handlers": [], "propagate": True},
+        "asyncio": {"level": "WARNING", "handlers": [], "propagate": True},
+        # Silence Uvicorn's default stdout logging
+        "uvicorn.error": {"level": logging.CRITICAL + 1, "handlers": ["null"]},
+        "uvicorn.access": {"level": logging.CRITICAL + 1, "handlers": ["null"]},
+    },
+})
+
+# Redirect stderr to a log file to prevent contamination of stdio
+# but preserve original stderr for MCP if needed. It gets a file of its own:
+# the rotating handler renames manus-mcp.log, which this open file would follow
 original_stderr = sys.stderr
-stderr_log = open(log_file, 'a')
+stderr_log = open(os.path.join(log_dir, "manus-mcp.stderr.log"), 'a')
 sys.stderr = stderr_log
 
 # Don't redirect stdout as MCP needs it for JSON communication
@@ -38,8 +64,9 @@ sys.stderr = stderr_log
 from dotenv import load_dotenv
 from app.workarounds.googlesearch import search
 from mcp.server import FastMCP
-from app.web_browser import ChromeBrowser, fetch_webpage, extract_content
+from app.web_browser import ChromeBrowser, fetch_webpage, fetch_webpages
 from app.code_execution import interpreter, bash_command, SANDBOX_DIR
+from app.json_utils import dumps
 
 # Load environment variables
 load_dotenv()
@@ -47,68 +74,63 @@ load_dotenv()
 logger = logging.getLogger("manus-mcp")
 logger.info("Starting Manus MCP server")
 
-# Redirect browser-use logging to the same file
-browser_logger = logging.getLogger("browser_use")
-browser_logger.handlers = []
-browser_logger.addHandler(logging.FileHandler(log_file))
-browser_logger.setLevel(logging.INFO)
-
-# Redirect other libraries' logging
-for lib_logger in ["httpx", "playwright", "asyncio"]:
-    lib_log = logging.getLogger(lib_logger)
-    lib_log.handlers = []
-    lib_log.addHandler(logging.FileHandler(log_file))
-    lib_log.setLevel(logging.WARNING)
-
-# Attempt to silence Uvicorn's default stdout logging
-try:
-    uvicorn_error_logger = logging.getLogger("uvicorn.error")
-    uvicorn_access_logger = logging.getLogger("uvicorn.access")
-    uvicorn_error_logger.handlers = []
-    uvicorn_access_logger.handlers = []
-    from logging import NullHandler
-    uvicorn_error_logger.addHandler(NullHandler())
-    uvicorn_access_logger.addHandler(NullHandler())
-    # Optionally set levels to prevent logging even if handlers are somehow re-added
-    uvicorn_error_logger.setLevel(logging.CRITICAL + 1) 
-    uvicorn_access_logger.setLevel(logging.CRITICAL + 1)
-    logger.info("Attempted to silence Uvicorn's default stdout/stderr loggers.")
-except Exception as e:
-    logger.error(f"Failed to configure Uvicorn loggers: {e}", exc_info=True)
-
 # Google Search configuration
 GOOGLE_SEARCH_MAX_RESULTS = int(os.getenv("GOOGLE_SEARCH_MAX_RESULTS", "10"))
+GOOGLE_SEARCH_CACHE_TTL = int(os.getenv("GOOGLE_SEARCH_CACHE_TTL", "600"))
+GOOGLE_SEARCH_CACHE_SIZE = 512
+GOOGLE_SEARCH_TIMEOUT = float(os.getenv("GOOGLE_SEARCH_TIMEOUT", "30"))
+SEARCH_POOL_SIZE = int(os.getenv("SEARCH_POOL_SIZE", "16"))
+
+# Threads for the blocking googlesearch calls, sized for network-bound work
+# rather than sharing the loop's CPU-sized default executor
+_search_pool = ThreadPoolExecutor(max_workers=SEARCH_POOL_SIZE, thread_name_prefix="gsearch")
+atexit.register(_search_pool.shutdown, wait=False)
+
+# Recent search results as (timestamp, links) by normalized (query, num_results),
+# least recently used first
+_search_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+# Searches in progress, so identical concurrent searches share a single request
+_search_inflight: Dict[tuple, asyncio.Task] = {}
 
 # Browser configuration
 CHROME_HOST = os.getenv("CHROME_MCP_HOST", "localhost")
 CHROME_PORT = int(os.getenv("CHROME_MCP_PORT", "9229"))
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "4"))
+
+# Code execution configuration
+ENABLE_CODE_EXEC = os.getenv("ENABLE_CODE_EXEC", "1") == "1"
 
 # Log sandbox directory
-logger.info(f"Using sandbox directory: {SANDBOX_DIR}")
+logger.info("Using sandbox directory: %s", SANDBOX_DIR)
+
+@asynccontextmanager
+async def _lifespan(server):
+    """Connect to Chrome in the background while the MCP session starts up."""
+    warmup = asyncio.create_task(_warmup_browser())
+    try:
+        yield
+    finally:
+        warmup.cancel()
+
 
 # Create the MCP server
-mcp = FastMCP("manus-mcp")
+mcp = FastMCP("manus-mcp", lifespan=_lifespan)
 
 # Note: auto_invoke=True is not supported in MCP 1.4.1
 # To automatically invoke a tool at the start of a conversation,
 # you would need to implement a custom handler or upgrade to a newer version of MCP
 
-# Browser instance (will be initialized on first use)
+# Browser instance (connected at startup or on first use), shared by all
+# browse_web actions; _init_lock guards its initialization
 browser = None
-browser_lock = asyncio.Lock()
+_init_lock = asyncio.Lock()
 
-# Define the manus_identity tool that will be automatically invoked at the start of each thread
-@mcp.tool()
-async def manus_identity() -> str:
-    """
-    Provides identity information about Manus, an AI assistant with real-time web capabilities.
-    This tool is automatically invoked at the start of each new message.
-    
-    Returns:
-        A string describing Manus's identity and capabilities.
-    """
-    logger.info("Invoking manus_identity tool")
-    return """
+# Browsers on tabs of their own for browse_web calls with a session_id,
+# least recently used first
+_session_browsers: "OrderedDict[str, ChromeBrowser]" = OrderedDict()
+
+# The manus_identity prompt, built once and shared by every call
+_MANUS_IDENTITY = sys.intern("""
 You are an Manus, an expert Planning Agent tasked with solving complex problems by creating and managing structured plans.
 Your job is:
 1. Analyze requests to understand the task scope
@@ -132,7 +154,24 @@ Break tasks into logical, sequential steps. Think about dependencies and verific
 Please make a plan before you start. Prefer to use tools rather than presenting the output in chat.
 
 DO NOT use the artifacts tool.
+    """)
+
+# Define the manus_identity tool that will be automatically invoked at the start of each thread
+@mcp.tool()
+async def manus_identity() -> str:
+    """
+    Provides identity information about Manus, an AI assistant with real-time web capabilities.
+    This tool is automatically invoked at the start of each new message.
+    
+    Returns:
+        A string describing Manus's identity and capabilities.
     """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Invoking manus_identity tool")
+    return _MANUS_IDENTITY
+
+# Precomputed hello_world response for the default name
+_HELLO_DEFAULT = "Hello, World! Welcome to Manus MCP."
 
 # Define the hello_world tool
 @mcp.tool()
@@ -143,9 +182,95 @@ async def hello_world(name: str = "World") -> str:
     Args:
         name: The name to greet. Defaults to 'World' if not provided.
     """
-    logger.info(f"Saying hello to {name}")
+    if name == "World":
+        return _HELLO_DEFAULT
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Saying hello to %s", name)
     return f"Hello, {name}! Welcome to Manus MCP."
 
+def _run_search(query: str, num_results: int, emit, stop: threading.Event) -> None:
+    """Pass each search result to emit as it is scraped, until stop is set."""
+    results = search(query, num_results=num_results)
+    try:
+        for link in results:
+            if stop.is_set():
+                break
+            emit(link)
+    finally:
+        results.close()
+
+async def _stream_search(query: str, num_results: int) -> tuple:
+    """
+    Collect search results from a worker thread as they arrive.
+    
+    Returns:
+        Tuple of the links and whether the search ran to completion; after
+        GOOGLE_SEARCH_TIMEOUT seconds the links found so far are returned
+    """
+    loop = asyncio.get_running_loop()
+    links_queue = asyncio.Queue()
+    done = object()
+    stop = threading.Event()
+    
+    def emit(link):
+        loop.call_soon_threadsafe(links_queue.put_nowait, link)
+    
+    def finished(future):
+        # Results emitted earlier are already queued ahead of this marker
+        links_queue.put_nowait(done)
+        if not future.cancelled():
+            future.exception()  # checked below; don't warn if we stopped early
+    
+    producer = loop.run_in_executor(_search_pool, _run_search, query, num_results, emit, stop)
+    producer.add_done_callback(finished)
+    
+    links = []
+    try:
+        async with asyncio.timeout(GOOGLE_SEARCH_TIMEOUT):
+            while len(links) < num_results:
+                link = await links_queue.get()
+                if link is done:
+                    break
+                links.append(link)
+    except TimeoutError:
+        if not links:
+            raise TimeoutError(f"no results within {GOOGLE_SEARCH_TIMEOUT}s")
+        logger.warning("Search for %s timed out, returning %s partial results", query, len(links))
+        return links, False
+    finally:
+        stop.set()
+    
+    # Surface scraping errors unless they only cut off extra results
+    if producer.done() and producer.exception() is not None and len(links) < num_results:
+        if not links:
+            raise producer.exception()
+        logger.warning("Search for %s failed after %s results: %s", query, len(links), producer.exception())
+        return links, False
+    return links, True
+
+async def _search_and_cache(key: tuple, query: str, num_results: int) -> List[str]:
+    """Run a search shared by the google_search calls waiting on key and cache its results."""
+    logger.info("Performing Google search for: %s (max results: %s)", query, num_results)
+    try:
+        # Run the search in a thread pool to prevent blocking
+        links, complete = await _stream_search(query, num_results)
+        logger.info("Found %s results for query: %s", len(links), query)
+        # Partial results are returned but not cached
+        if complete:
+            _search_cache[key] = (time.monotonic(), links)
+            _search_cache.move_to_end(key)
+            if len(_search_cache) > GOOGLE_SEARCH_CACHE_SIZE:
+                _search_cache.popitem(last=False)
+        return links
+    finally:
+        del _search_inflight[key]
+
+def _retrieve_search_error(task: asyncio.Task) -> None:
+    """Mark a search's error as seen, in case every caller was cancelled before it finished."""
+    if not task.cancelled():
+        task.exception()
+
 # Define the google_search tool
 @mcp.tool()
 async def google_search(query: str, num_results: int = None) -> List[str]:
@@ -166,22 +291,24 @@ async def google_search(query: str, num_results: int = None) -> List[str]:
     if num_results is None:
         num_results = GOOGLE_SEARCH_MAX_RESULTS
     
-    logger.info(f"Performing Google search for: {query} (max results: {num_results})")
+    key = (query.strip().lower(), num_results)
+    cached = _search_cache.get(key)
+    if cached is not None and time.monotonic() - cached[0] < GOOGLE_SEARCH_CACHE_TTL:
+        _search_cache.move_to_end(key)
+        logger.info("Using cached results for query: %s", query)
+        return list(cached[1])
+    
+    task = _search_inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_search_and_cache(key, query, num_results))
+        task.add_done_callback(_retrieve_search_error)
+        _search_inflight[key] = task
     
-    # Run the search in a thread pool to prevent blocking
-    loop = asyncio.get_event_loop()
+    # Shielded, so a cancelled caller doesn't cancel the search for the others
     try:
-        links = await loop.run_in_executor(
-            None, 
-            lambda: list(search(
-                query, 
-                num_results=num_results
-            ))
-        )
-        logger.info(f"Found {len(links)} results for query: {query}")
-        return links
+        return list(await asyncio.shield(task))
     except Exception as e:
-        logger.error(f"Error performing Google search: {e}")
+        logger.error("Error performing Google search: %s", e)
         return [f"Error performing search: {str(e)}"]
 
 # Helper function to ensure browser is initialized
@@ -189,23 +316,171 @@ async def ensure_browser_initialized():
     """Ensure browser is initialized."""
     global browser
     
-    if browser is None:
-        logger.info(f"Initializing ChromeBrowser (host: {CHROME_HOST}, port: {CHROME_PORT})...")
-        browser = ChromeBrowser(chrome_host=CHROME_HOST, chrome_port=CHROME_PORT)
-        
-        # Test connection
-        if not await browser.connect():
-            logger.error(f"Failed to connect to Chrome at {CHROME_HOST}:{CHROME_PORT}")
-            raise Exception(f"Could not connect to Chrome DevTools at {CHROME_HOST}:{CHROME_PORT}. Make sure Chrome is running with --remote-debugging-port={CHROME_PORT}")
-        
-        logger.info("Successfully connected to Chrome DevTools")
+    if browser is not None:
+        return browser
+    
+    async with _init_lock:
+        if browser is None:
+            logger.info("Initializing ChromeBrowser (host: %s, port: %s)...", CHROME_HOST, CHROME_PORT)
+            instance = ChromeBrowser(chrome_host=CHROME_HOST, chrome_port=CHROME_PORT)
+            
+            # Test connection
+            if not await instance.connect():
+                logger.error("Failed to connect to Chrome at %s:%s", CHROME_HOST, CHROME_PORT)
+                raise Exception(f"Could not connect to Chrome DevTools at {CHROME_HOST}:{CHROME_PORT}. Make sure Chrome is running with --remote-debugging-port={CHROME_PORT}")
+            
+            browser = instance
+            logger.info("Successfully connected to Chrome DevTools")
     
     return browser
 
+def get_session_browser(session_id: str) -> ChromeBrowser:
+    """
+    Get the browser tab assigned to a session.
+    
+    Up to BROWSER_POOL_SIZE sessions get a tab of their own; after that, a new
+    session takes over the tab of the least recently used one.
+    """
+    instance = _session_browsers.pop(session_id, None)
+    if instance is None:
+        if len(_session_browsers) < BROWSER_POOL_SIZE:
+            instance = ChromeBrowser(chrome_host=CHROME_HOST, chrome_port=CHROME_PORT, new_tab=True)
+        else:
+            _, instance = _session_browsers.popitem(last=False)
+            logger.info("Reassigning browser tab %s to session %s", instance.tab_id, session_id)
+    _session_browsers[session_id] = instance
+    return instance
+
+async def _warmup_browser():
+    """Connect the shared browser ahead of the first browse_web call."""
+    try:
+        await ensure_browser_initialized()
+    except Exception as e:
+        # browse_web will retry and report the error when it is used
+        logger.warning("Browser warm-up failed: %s", e)
+
+def _truncate_text(text: str, limit: int = 3000) -> str:
+    """Truncate page text to avoid overwhelming responses."""
+    return text[:limit] + "..." if len(text) > limit else text
+
+# browse_web action handlers; each takes the browser to use plus the tool's
+# keyword arguments and ignores the ones it doesn't need
+async def _browse_navigate(browser_instance: ChromeBrowser, *, url: str, **_) -> str:
+    """Navigate the browser to url."""
+    if not url:
+        return "Error: URL is required for 'navigate' action"
+    logger.info("Navigating to URL: %s", url)
+    async with browser_instance.lock:
+        result = await browser_instance.navigate(url)
+    if result["success"]:
+        return f"Successfully navigated to {url}"
+    else:
+        return f"Failed to navigate to {url}: {result.get('error', 'Unknown error')}"
+
+async def _browse_get_content(browser_instance: ChromeBrowser, *, full_html: bool, **_) -> str:
+    """Summarize the current page, with its HTML if full_html is set."""
+    logger.info("Getting page content")
+    # Summarized in the browser, so the page HTML is only transferred
+    # when it was asked for
+    async with browser_instance.lock:
+        result = await browser_instance.get_summary(text_limit=3000)
+        if result["success"] and full_html:
+            content = await browser_instance.get_content()
+            if not content["success"]:
+                return f"Failed to get page content: {content.get('error', 'Unknown error')}"
+    if result["success"]:
+        response = {
+            "title": result["title"],
+            "text": _truncate_text(result["text"]),
+            "links_count": result["link_count"],
+            "images_count": result["image_count"]
+        }
+        if full_html:
+            response["html"] = content["html"]
+        return dumps(response)
+    else:
+        return f"Failed to get page content: {result.get('error', 'Unknown error')}"
+
+async def _browse_fetch(browser_instance: ChromeBrowser, *, url: str, full_html: bool, **_) -> str:
+    """Load url and return its extracted content."""
+    if not url:
+        return "Error: URL is required for 'fetch' action"
+    logger.info("Fetching webpage: %s", url)
+    result = await fetch_webpage(url, text_limit=3000, browser=browser_instance)
+    if result["success"]:
+        response = {
+            "url": result["url"],
+            "title": result["title"],
+            "description": result["description"],
+            "text": _truncate_text(result["text"])
+        }
+        if full_html:
+            response["html"] = result["html"]
+        return dumps(response)
+    else:
+        return f"Failed to fetch webpage: {result.get('error', 'Unknown error')}"
+
+async def _browse_fetch_many(browser_instance: ChromeBrowser, *, urls: List[str], **_) -> str:
+    """Fetch the content of several pages concurrently."""
+    if not urls:
+        return "Error: URLs are required for 'fetch_many' action"
+    logger.info("Fetching %s webpages", len(urls))
+    results = await fetch_webpages(urls, text_limit=3000)
+    
+    response = []
+    for page_url, result in zip(urls, results):
+        if not result["success"]:
+            response.append({"url": page_url, "error": result.get("error", "Unknown error")})
+            continue
+        
+        response.append({
+            "url": result["url"],
+            "title": result["title"],
+            "description": result["description"],
+            "text": _truncate_text(result["text"])
+        })
+    return dumps(response)
+
+async def _browse_execute_js(browser_instance: ChromeBrowser, *, script: str, **_) -> str:
+    """Run script in the current page and report its result."""
+    if not script:
+        return "Error: Script is required for 'execute_js' action"
+    logger.info("Executing JavaScript: %s", script)
+    async with browser_instance.lock:
+        response = await browser_instance.evaluate(script)
+    
+    if "result" in response and "result" in response["result"]:
+        return f"JavaScript execution result: {response['result']['result'].get('value', 'No return value')}"
+    elif "exceptionDetails" in response["result"]:
+        error = response["result"]["exceptionDetails"]["exception"]["description"]
+        return f"JavaScript execution error: {error}"
+    else:
+        return f"JavaScript executed (no result returned)"
+
+async def _browse_scroll(browser_instance: ChromeBrowser, *, scroll_amount: int, **_) -> str:
+    """Scroll the current page vertically by scroll_amount pixels."""
+    if scroll_amount is None:
+        return "Error: Scroll amount is required for 'scroll' action"
+    logger.info("Scrolling page by %d pixels", scroll_amount)
+    async with browser_instance.lock:
+        await browser_instance.evaluate(f"window.scrollBy(0, {scroll_amount});")
+    direction = "down" if scroll_amount > 0 else "up"
+    return f"Scrolled {direction} by {abs(scroll_amount)} pixels"
+
+_BROWSE_ACTIONS = {
+    "navigate": _browse_navigate,
+    "get_content": _browse_get_content,
+    "fetch": _browse_fetch,
+    "fetch_many": _browse_fetch_many,
+    "execute_js": _browse_execute_js,
+    "scroll": _browse_scroll,
+}
+
 # Define the browser tool
 @mcp.tool()
 async def browse_web(action: str, url: str = None, script: str = None, 
-                    scroll_amount: int = None) -> str:
+                    scroll_amount: int = None, urls: List[str] = None,
+                    session_id: str = None, full_html: bool = False) -> str:
     """
     Interact with a web browser to navigate websites and extract information.
     
@@ -219,107 +494,39 @@ async def browse_web(action: str, url: str = None, script: str = None,
             - 'execute_js': Execute JavaScript code
             - 'scroll': Scroll the page
             - 'fetch': Fetch webpage content (navigate + get_content)
+            - 'fetch_many': Fetch the content of several webpages concurrently
         url: URL for 'navigate' or 'fetch' actions
         script: JavaScript code for 'execute_js' action  
         scroll_amount: Pixels to scroll (positive for down, negative for up)
+        urls: URLs for 'fetch_many' action
+        session_id: Optional name for a browsing session. Actions with the same
+            session_id share a tab of their own, so independent tasks can browse
+            in parallel; without it, actions use the shared main tab. When more
+            sessions than BROWSER_POOL_SIZE are active, the least recently used
+            session's tab is handed to the new one
+        full_html: Also return the page's complete HTML from 'get_content' and
+            'fetch'. Off by default because pages are often megabytes large
     
     Returns:
         A string with the result of the action
     """
-    async with browser_lock:
-        try:
+    handler = _BROWSE_ACTIONS.get(action)
+    if handler is None:
+        return f"Error: Unknown action '{action}'. Available actions: {', '.join(_BROWSE_ACTIONS)}"
+    
+    try:
+        if session_id:
+            browser_instance = get_session_browser(session_id)
+        else:
             browser_instance = await ensure_browser_initialized()
-            
-            if action == "navigate":
-                if not url:
-                    return "Error: URL is required for 'navigate' action"
-                logger.info(f"Navigating to URL: {url}")
-                result = await browser_instance.navigate(url)
-                if result["success"]:
-                    return f"Successfully navigated to {url}"
-                else:
-                    return f"Failed to navigate to {url}: {result.get('error', 'Unknown error')}"
-            
-            elif action == "get_content":
-                logger.info("Getting page content")
-                result = await browser_instance.get_content()
-                if result["success"]:
-                    html = result["html"]
-                    
-                    # Extract content using BeautifulSoup
-                    extracted = await extract_content(html)
-                    if extracted["success"]:
-                        # Truncate text to avoid overwhelming response
-                        text = extracted["text"]
-                        truncated_text = text[:3000] + "..." if len(text) > 3000 else text
-                        
-                        response = {
-                            "title": extracted["title"],
-                            "text": truncated_text,
-                            "links_count": len(extracted["links"]),
-                            "images_count": len(extracted["images"])
-                        }
-                        return json.dumps(response, indent=2)
-                    else:
-                        return f"Failed to extract content: {extracted.get('error', 'Unknown error')}"
-                else:
-                    return f"Failed to get page content: {result.get('error', 'Unknown error')}"
-            
-            elif action == "fetch":
-                if not url:
-                    return "Error: URL is required for 'fetch' action"
-                logger.info(f"Fetching webpage: {url}")
-                result = await fetch_webpage(url)
-                if result["success"]:
-                    # Truncate text to avoid overwhelming response
-                    text = result["text"]
-                    truncated_text = text[:3000] + "..." if len(text) > 3000 else text
-                    
-                    response = {
-                        "url": result["url"],
-                        "title": result["title"],
-                        "description": result["description"],
-                        "text": truncated_text
-                    }
-                    return json.dumps(response, indent=2)
-                else:
-                    return f"Failed to fetch webpage: {result.get('error', 'Unknown error')}"
-            
-            elif action == "execute_js":
-                if not script:
-                    return "Error: Script is required for 'execute_js' action"
-                logger.info(f"Executing JavaScript: {script}")
-                response = await browser_instance._send_command("Runtime.evaluate", {
-                    "expression": script
-                })
-                
-                if "result" in response and "result" in response["result"]:
-                    return f"JavaScript execution result: {response['result']['result'].get('value', 'No return value')}"
-                elif "exceptionDetails" in response["result"]:
-                    error = response["result"]["exceptionDetails"]["exception"]["description"]
-                    return f"JavaScript execution error: {error}"
-                else:
-                    return f"JavaScript executed (no result returned)"
-            
-            elif action == "scroll":
-                if scroll_amount is None:
-                    return "Error: Scroll amount is required for 'scroll' action"
-                logger.info(f"Scrolling page by {scroll_amount} pixels")
-                await browser_instance._send_command("Runtime.evaluate", {
-                    "expression": f"window.scrollBy(0, {scroll_amount});"
-                })
-                direction = "down" if scroll_amount > 0 else "up"
-                return f"Scrolled {direction} by {abs(scroll_amount)} pixels"
-            
-            else:
-                return f"Error: Unknown action '{action}'. Available actions: navigate, get_content, fetch, execute_js, scroll"
         
-        except Exception as e:
-            logger.error(f"Browser action '{action}' failed: {str(e)}")
-            return f"Error performing browser action: {str(e)}"
+        return await handler(browser_instance, url=url, script=script, scroll_amount=scroll_amount,
+                             urls=urls, full_html=full_html)
+    except Exception as e:
+        logger.error("Browser action '%s' failed: %s", action, e)
+        return f"Error performing browser action: {str(e)}"
 
 # Define the interpreter tool (imported from app.code_execution)
-@mcp.tool()
 async def code_interpreter(action: str, filename: str = None, content: str = None, 
                           language: str = None, timeout: int = 10) -> str:
     """
@@ -335,7 +542,7 @@ async def code_interpreter(action: str, filename: str = None, content: str = Non
     
     Args:
         action: The action to perform. Options include:
-            - 'read': Read the contents of a file
+            - 'read': Read the contents of a file (returned as JSON; large files are truncated)
             - 'write': Write content to a file
             - 'execute': Execute a file or code snippet
             - 'list': List files in the sandbox
@@ -350,7 +557,6 @@ async def code_interpreter(action: str, filename: str = None, content: str = Non
     return await interpreter(action, filename, content, language, timeout)
 
 # Define the bash tool (imported from app.code_execution)
-@mcp.tool()
 async def bash_tool(command: str, timeout: int = 30, background: bool = False) -> str:
     """
     Execute a bash command in the sandbox directory.
@@ -389,7 +595,22 @@ async def bash_tool(command: str, timeout: int = 30, background: bool = False) -
     """
     return await bash_command(command, timeout, background)
 
+# The code execution tools are only offered when enabled
+if ENABLE_CODE_EXEC:
+    mcp.tool()(code_interpreter)
+    mcp.tool()(bash_tool)
+else:
+    logger.info("Code execution tools disabled (ENABLE_CODE_EXEC=0)")
+
 if __name__ == "__main__":
+    # Use uvloop for the server's event loop where it is available
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logger.info("Using uvloop event loop")
+    except ImportError:
+        logger.info("uvloop not installed, using default asyncio event loop")
+    
     # Note: Removed 'sys.stdout = sys.stderr' redirection as it broke the MCP handshake.
     # Run the server with stdio transport
     mcp.run(transport='stdio')
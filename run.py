@@ -26,13 +26,21 @@ def main():
     try:
         host = os.getenv("MCP_HOST", "127.0.0.1")
         port = int(os.getenv("MCP_PORT", "8000"))
+        # The auto-reloader is for development only and runs a single worker;
+        # DEV and WEB_CONCURRENCY are still honoured for existing setups
+        reload = os.getenv("MCP_RELOAD", "true" if os.getenv("DEV") == "1" else "false").lower() == "true"
+        workers = 1 if reload else int(os.getenv("MCP_WORKERS", os.getenv("WEB_CONCURRENCY", "4")))
         
-        logger.info(f"Starting Manus MCP server on {host}:{port}")
+        logger.info(f"Starting Manus MCP server on {host}:{port} ({workers} worker(s), reload={reload})")
         uvicorn.run(
             "app.main:app",
             host=host,
             port=port,
-            reload=True,
+            reload=reload,
+            workers=workers,
+            loop="auto",
+            http="httptools",
+            log_level="info",
         )
     except Exception as e:
         logger.error(f"Error starting server: {e}")
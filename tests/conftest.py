@@ -0,0 +1,68 @@
+"""Shared fixtures for the test suite."""
+
+import asyncio
+import itertools
+
+import httpx
+import pytest
+
+from app import web_browser
+from app.json_utils import dumps, loads
+
+
+class FakeChrome:
+    """Stub of Chrome's /json endpoints and tab websockets, listing the newest tab first."""
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+        self.tabs = []
+        self.connected = []
+
+    def open_tab(self, type="page"):
+        tab_id = f"tab{next(self._ids)}"
+        tab = {"id": tab_id, "type": type, "webSocketDebuggerUrl": f"ws://chrome/{tab_id}"}
+        self.tabs.insert(0, tab)
+        return tab
+
+    def handle(self, request):
+        if request.url.path == "/json/new":
+            return httpx.Response(200, json=self.open_tab())
+        return httpx.Response(200, json=self.tabs)
+
+    async def connect(self, url, **kwargs):
+        self.connected.append(url.rsplit("/", 1)[-1])
+        return FakeWebSocket()
+
+
+class FakeWebSocket:
+    """Websocket that answers every command with an empty result."""
+
+    def __init__(self):
+        self._frames = asyncio.Queue()
+
+    async def send(self, data):
+        self._frames.put_nowait(dumps({"id": loads(data)["id"], "result": {}}))
+
+    async def close(self):
+        self._frames.put_nowait(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        frame = await self._frames.get()
+        if frame is None:
+            raise StopAsyncIteration
+        return frame
+
+
+@pytest.fixture
+def chrome(monkeypatch):
+    """Point ChromeBrowser at a FakeChrome."""
+    fake = FakeChrome()
+    client = httpx.AsyncClient
+    transport = httpx.MockTransport(fake.handle)
+    monkeypatch.setattr(web_browser.httpx, "AsyncClient", lambda: client(transport=transport))
+    monkeypatch.setattr(web_browser.websockets, "connect", fake.connect)
+    monkeypatch.setattr(web_browser, "_owned_tabs", set())
+    return fake
@@ -0,0 +1,146 @@
+"""Tests for app.code_execution."""
+
+import asyncio
+import json
+import os
+import signal
+import tempfile
+
+import pytest
+
+os.environ.setdefault("SANDBOX_DIR", tempfile.mkdtemp(prefix="manus-sandbox-"))
+
+from app import code_execution  # noqa: E402
+
+
+def run(coro):
+    """Run a coroutine on a fresh event loop and stop the workers it started."""
+    async def main():
+        try:
+            return await coro
+        finally:
+            for pool in code_execution._WORKER_POOL.values():
+                while not pool.empty():
+                    worker = pool.get_nowait()
+                    if worker is not None:
+                        await code_execution._terminate(worker)
+            code_execution._WORKER_POOL.clear()
+
+    return asyncio.run(main())
+
+
+async def execute(source: str) -> dict:
+    """Run a Python snippet through the interpreter tool and decode the result."""
+    return json.loads(await code_execution.interpreter("execute", content=source, language="python"))
+
+
+async def execute_many(source: str) -> list:
+    """Run the same snippet enough times to reach every pooled worker."""
+    return [await execute(source) for _ in range(code_execution.WORKER_POOL_SIZE * 2)]
+
+
+def test_rewritten_module_is_reimported():
+    async def scenario():
+        helper = os.path.join(code_execution.SANDBOX_DIR, "reimported_helper.py")
+        with open(helper, "w") as f:
+            f.write("def f():\n    return 'v1'\n")
+        await execute_many("import reimported_helper; print(reimported_helper.f())")
+        with open(helper, "w") as f:
+            f.write("def f():\n    return 'v2'\n")
+        return await execute_many("import reimported_helper; print(reimported_helper.f())")
+
+    assert [r["stdout"] for r in run(scenario())] == ["v2\n"] * (code_execution.WORKER_POOL_SIZE * 2)
+
+
+def test_environment_changes_do_not_leak():
+    async def scenario():
+        await execute_many("import os; os.environ['LEAK'] = 'yes'")
+        return await execute_many("import os; print(os.environ.get('LEAK'))")
+
+    assert all(r["stdout"] == "None\n" for r in run(scenario()))
+
+
+def test_sys_path_changes_do_not_leak():
+    async def scenario():
+        await execute_many("import sys; sys.path.append('/leaked')")
+        return await execute_many("import sys; print('/leaked' in sys.path)")
+
+    assert all(r["stdout"] == "False\n" for r in run(scenario()))
+
+
+def test_recursion_limit_does_not_leak():
+    async def scenario():
+        await execute_many("import sys; sys.setrecursionlimit(50)")
+        return await execute_many("import sys; print(sys.getrecursionlimit())")
+
+    assert all(r["stdout"] != "50\n" for r in run(scenario()))
+
+
+def test_os_exit_is_reported_as_exit_code():
+    result = run(execute("import os; os._exit(3)"))
+    assert result["exit_code"] == 3
+
+
+def test_dead_worker_is_reported_as_exit_code():
+    async def scenario():
+        died = await execute("import os, signal; os.kill(os.getppid(), signal.SIGKILL)")
+        return died, await execute("print('still working')")
+
+    died, after = run(scenario())
+    assert died["exit_code"] == -9
+    assert after["stdout"] == "still working\n"
+
+
+def test_global_timeout_stops_bash_command(monkeypatch):
+    monkeypatch.setattr(code_execution, "GLOBAL_TIMEOUT", 1)
+    pid_file = os.path.join(code_execution.SANDBOX_DIR, "bash_command.pid")
+    result = run(code_execution.bash_command(f"echo $$ > {pid_file}; sleep 30; echo", timeout=10))
+
+    assert "global timeout" in result
+    with open(pid_file) as f:
+        pid = int(f.read())
+    with pytest.raises(ProcessLookupError):
+        os.kill(pid, 0)
+
+
+def test_global_timeout_stops_interpreter_execution(monkeypatch):
+    monkeypatch.setattr(code_execution, "GLOBAL_TIMEOUT", 1)
+    pid_file = os.path.join(code_execution.SANDBOX_DIR, "interpreter.pid")
+    result = run(code_execution.interpreter("execute", content=f"echo $$ > {pid_file}; sleep 30",
+                                            language="bash", timeout=10))
+
+    assert "global timeout" in result
+    with open(pid_file) as f:
+        pid = int(f.read())
+    with pytest.raises(ProcessLookupError):
+        os.kill(pid, 0)
+
+
+def test_execute_python_output_includes_child_processes():
+    result = run(code_execution.execute_python("import os; print('from-parent', flush=True); os.system('echo from-child')"))
+    assert result["exit_code"] == 0
+    assert result["stdout"] == "from-parent\nfrom-child\n"
+
+
+def test_execute_python_reports_syntax_errors():
+    result = run(code_execution.execute_python("print('unclosed'"))
+    assert result["exit_code"] == 1
+    assert "SyntaxError" in result["stderr"]
+
+
+def test_execute_python_wall_clock_limit(monkeypatch):
+    monkeypatch.setattr(code_execution, "EXECUTE_PYTHON_TIMEOUT", 0.5)
+
+    async def scenario():
+        timed_out = await code_execution.execute_python("import time; time.sleep(100)")
+        return timed_out, await code_execution.execute_python("print('next')")
+
+    timed_out, after = run(scenario())
+    assert "timed out" in timed_out["stderr"]
+    assert after["stdout"] == "next\n"
+
+
+def test_execute_python_cpu_limit(monkeypatch):
+    monkeypatch.setitem(code_execution._PYTHON_WORKER_POOLS, "execute_python", (1, 1, 0))
+    result = run(code_execution.execute_python("while True: pass"))
+    assert result["exit_code"] == -signal.SIGXCPU
@@ -0,0 +1,34 @@
+"""Tests for app.json_utils."""
+
+from app import json_utils
+from app.json_utils import dumps, loads
+
+
+def test_round_trip():
+    obj = {"text": "café", "items": [1, 2.5, None, True]}
+    assert loads(dumps(obj)) == obj
+    assert loads(dumps(obj, pretty=True)) == obj
+
+
+def test_lone_surrogate_escapes_are_accepted():
+    # Chrome emits these for page strings that aren't valid UTF-16
+    assert loads('{"value": "a\\ud800b"}') == {"value": "a\ud800b"}
+
+
+def test_lone_surrogates_are_dumped_escaped():
+    # Page text cut in the middle of an emoji
+    obj = {"text": "cut \ud83d"}
+    text = dumps(obj)
+    text.encode("utf-8")
+    assert loads(text) == obj
+    assert loads(dumps(obj, pretty=True)) == obj
+
+
+def test_stdlib_fallback_escapes_lone_surrogates(monkeypatch):
+    monkeypatch.setattr(json_utils, "orjson", None)
+    obj = {"text": "café \ud83d"}
+    text = dumps(obj)
+    text.encode("utf-8")
+    assert loads(text) == obj
+    # Output that encodes cleanly keeps non-ASCII characters unescaped
+    assert dumps({"text": "café"}) == '{"text":"café"}'
@@ -0,0 +1,111 @@
+"""Tests for the tools in mcp_server."""
+
+import asyncio
+import sys
+import time
+import types
+from collections import OrderedDict
+
+import pytest
+
+pytest.importorskip("mcp")
+pytest.importorskip("dotenv")
+
+try:
+    import app.workarounds.googlesearch  # noqa: F401
+except ImportError:
+    # Not part of the repository; every test replaces search anyway
+    googlesearch = types.ModuleType("app.workarounds.googlesearch")
+    googlesearch.search = None
+    sys.modules["app.workarounds"] = types.ModuleType("app.workarounds")
+    sys.modules["app.workarounds.googlesearch"] = googlesearch
+
+import mcp_server  # noqa: E402
+
+# Importing the server sends stderr to its log file
+sys.stderr = mcp_server.original_stderr
+
+
+def test_session_and_shared_browsers_use_distinct_tabs(chrome, monkeypatch):
+    chrome.open_tab()
+    monkeypatch.setattr(mcp_server, "browser", None)
+    monkeypatch.setattr(mcp_server, "_session_browsers", OrderedDict())
+    monkeypatch.setattr(mcp_server, "CHROME_HOST", "chrome")
+
+    async def scenario():
+        session = mcp_server.get_session_browser("research")
+        await session.connect()
+        # The session's tab is now listed first
+        shared = await mcp_server.ensure_browser_initialized()
+        return session, shared
+
+    session, shared = asyncio.run(scenario())
+    assert session.tab_id != shared.tab_id
+    assert shared.tab_id == "tab1"
+
+
+@pytest.fixture
+def fake_search(monkeypatch):
+    """Replace Google search with a generator that yields a result every 50 ms."""
+    calls = []
+
+    def search(query, num_results):
+        calls.append(query)
+        if query == "broken":
+            raise RuntimeError("search failed")
+        for i in range(num_results):
+            # "stalled" stops producing after two results
+            time.sleep(0.05 if query != "stalled" or i < 2 else 1)
+            yield f"https://example.com/{query}/{i}"
+
+    monkeypatch.setattr(mcp_server, "search", search)
+    monkeypatch.setattr(mcp_server, "_search_cache", OrderedDict())
+    monkeypatch.setattr(mcp_server, "_search_inflight", {})
+    return calls
+
+
+def test_identical_searches_share_one_producer(fake_search):
+    async def scenario():
+        return await asyncio.gather(mcp_server.google_search("python", 3),
+                                    mcp_server.google_search(" Python ", 3))
+
+    first, second = asyncio.run(scenario())
+    assert first == second == [f"https://example.com/python/{i}" for i in range(3)]
+    assert fake_search == ["python"]
+    assert list(mcp_server._search_cache) == [("python", 3)]
+
+
+def test_cancelled_caller_leaves_shared_search_running(fake_search):
+    async def scenario():
+        leader = asyncio.create_task(mcp_server.google_search("python", 3))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(mcp_server.google_search("python", 3))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return leader, await follower
+
+    leader, result = asyncio.run(scenario())
+    assert leader.cancelled()
+    assert result == [f"https://example.com/python/{i}" for i in range(3)]
+    assert fake_search == ["python"]
+
+
+def test_timed_out_search_returns_partial_results_uncached(fake_search, monkeypatch):
+    monkeypatch.setattr(mcp_server, "GOOGLE_SEARCH_TIMEOUT", 0.5)
+
+    async def scenario():
+        result = await mcp_server.google_search("stalled", 5)
+        # Let the worker thread notice it was stopped
+        await asyncio.sleep(1)
+        return result
+
+    assert asyncio.run(scenario()) == [f"https://example.com/stalled/{i}" for i in range(2)]
+    assert not mcp_server._search_cache
+    assert not mcp_server._search_inflight
+
+
+def test_failed_search_clears_inflight_entry(fake_search):
+    result = asyncio.run(mcp_server.google_search("broken", 3))
+    assert result == ["Error performing search: search failed"]
+    assert not mcp_server._search_inflight
+    assert not mcp_server._search_cache
@@ -0,0 +1,111 @@
+"""Tests for app.web_browser."""
+
+import asyncio
+
+from app.json_utils import loads
+from app.web_browser import ChromeBrowser, _extract
+
+
+def test_close_survives_a_failed_reader():
+    async def scenario():
+        browser = ChromeBrowser("localhost", 9)
+
+        async def failed_reader():
+            raise ValueError("undecodable frame")
+
+        browser._reader = asyncio.create_task(failed_reader())
+        await asyncio.sleep(0)
+        await browser.close()
+        return browser
+
+    browser = asyncio.run(scenario())
+    assert browser._reader is None
+    assert browser.websocket is None
+
+
+def test_evaluate_drops_the_cached_page():
+    async def scenario():
+        browser = ChromeBrowser("localhost", 9)
+
+        async def send_command(method, params=None):
+            return {"result": {"result": {"value": None}}}
+
+        browser._send_command = send_command
+        browser.url = "http://example.com/"
+        browser.cache_page("http://example.com/", 3000, {"success": True})
+        await browser.evaluate("location.href = 'http://example.org/'")
+        return browser
+
+    browser = asyncio.run(scenario())
+    assert browser.url is None
+    assert browser.cached_page("http://example.com/", 3000) is None
+
+
+def test_extract_tolerates_lone_surrogates():
+    html = loads('{"v": "<html><head><title>T\\ud83d</title></head><body><p>cut \\ud83d</p></body></html>"}')["v"]
+    extracted = _extract(html, {"title", "text"})
+    assert extracted["title"].startswith("T")
+    assert "cut" in extracted["text"]
+
+
+def test_shared_browser_skips_tabs_it_does_not_own(chrome):
+    chrome.open_tab()
+    chrome.open_tab(type="service_worker")
+
+    async def scenario():
+        pooled = ChromeBrowser("chrome", 9222, new_tab=True)
+        shared = ChromeBrowser("chrome", 9222)
+        await pooled.connect()
+        await shared.connect()
+        # The pooled tab is now listed first; reconnecting keeps the same tab
+        chrome.open_tab()
+        await shared.connect()
+        await pooled.connect()
+        return pooled, shared
+
+    pooled, shared = asyncio.run(scenario())
+    assert shared.tab_id == "tab1"
+    assert pooled.tab_id == "tab3"
+    assert chrome.connected == ["tab3", "tab1", "tab1", "tab3"]
+
+
+EXTRACT_FIELDS = {"title", "description", "text", "links", "images"}
+
+
+def test_extract_fields():
+    html = """<html><head><title>Example</title>
+    <meta name="Description" content="An example page"></head>
+    <body><h1>Heading</h1><p>Some <b>bold</b> text with <a href="/more">a <i>link</i></a>.</p>
+    <img src="/logo.png" alt="Logo"><img alt="no source"></body></html>"""
+
+    assert _extract(html, EXTRACT_FIELDS) == {
+        "title": "Example",
+        "description": "An example page",
+        "text": "Example Heading Some bold text with a link .",
+        "links": [{"text": "a link", "href": "/more"}],
+        "images": [{"alt": "Logo", "src": "/logo.png"}],
+    }
+
+
+def test_extract_skips_script_and_style():
+    html = """<html><head><style>p { color: red }</style></head>
+    <body><script>var hidden = 1;</script><p>visible</p><script>more()</script>after</body></html>"""
+
+    assert _extract(html, {"text"})["text"] == "visible after"
+
+
+def test_extract_stops_collecting_text_past_the_limit():
+    paragraphs = "".join(f"<p>paragraph {i}</p>" for i in range(1000))
+    html = f"<html><head><title>Long</title></head><body>{paragraphs}<a href='/end'>end</a></body></html>"
+
+    extracted = _extract(html, {"title", "text"}, text_limit=30)
+    assert extracted["title"] == "Long"
+    assert extracted["text"] == "Long paragraph 0 paragraph 1 paragraph 2"
+    # Links are still collected in full past the text limit
+    assert _extract(html, {"text", "links"}, text_limit=30)["links"] == [{"text": "end", "href": "/end"}]
+
+
+def test_extract_empty_html():
+    empty = {"title": None, "description": None, "text": "", "links": [], "images": []}
+    assert _extract("", EXTRACT_FIELDS) == empty
+    assert _extract("  \n\t ", EXTRACT_FIELDS) == empty